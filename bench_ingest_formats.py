@@ -0,0 +1,94 @@
+# Benchmark: lectura en chunks de un mes de taxi sintético como CSV, CSV.gz
+# y Parquet (ingest_data.read_chunks, sin Postgres). Cada caso corre en un
+# proceso nuevo para que el pico de RSS sea solo el de ese formato.
+#
+# Uso:
+#   python bench_ingest_formats.py --rows 1000000
+import argparse
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ingest_data
+
+
+def make_trips(rows, month='2021-01', seed=0):
+    # columnas y tipos de yellow_tripdata, con ~2% de viajes sin vendor/pasajeros
+    rng = np.random.default_rng(seed)
+    pickup = pd.Timestamp(f'{month}-01') + pd.to_timedelta(rng.integers(0, 28 * 86400, rows), unit='s')
+    df = pd.DataFrame({
+        'VendorID': rng.integers(1, 3, rows).astype('float64'),
+        'tpep_pickup_datetime': pickup,
+        'tpep_dropoff_datetime': pickup + pd.to_timedelta(rng.integers(60, 3600, rows), unit='s'),
+        'passenger_count': rng.integers(0, 6, rows).astype('float64'),
+        'trip_distance': rng.random(rows).round(2) * 10,
+        'RatecodeID': 1.0,
+        'store_and_fwd_flag': 'N',
+        'PULocationID': rng.integers(1, 266, rows),
+        'DOLocationID': rng.integers(1, 266, rows),
+        'payment_type': rng.integers(1, 5, rows).astype('float64'),
+        'fare_amount': rng.random(rows).round(2) * 50,
+        'extra': 0.5,
+        'mta_tax': 0.5,
+        'tip_amount': rng.random(rows).round(2) * 5,
+        'tolls_amount': 0.0,
+        'improvement_surcharge': 0.3,
+        'total_amount': rng.random(rows).round(2) * 60,
+        'congestion_surcharge': 2.5,
+    })
+    unknown = rng.random(rows) < 0.02
+    df.loc[unknown, ['VendorID', 'passenger_count', 'RatecodeID', 'payment_type', 'store_and_fwd_flag']] = np.nan
+    return df
+
+
+def read_all(file_name, chunksize, parquet_cache=None):
+    # corre en un proceso aparte: tiempo y pico de RSS de leer todo el archivo
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    rows = sum(len(df) for df in ingest_data.read_chunks(file_name, chunksize, parquet_cache))
+    seconds = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rows, seconds, peak_rss / 1024, (peak_rss - start_rss) / 1024
+
+
+def measure(label, file_name, chunksize, parquet_cache=None):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        rows, seconds, peak_mb, delta_mb = pool.submit(read_all, file_name, chunksize, parquet_cache).result()
+    print(
+        f"{label:>22}: {rows:,} filas en {seconds:6.2f}s ({rows / seconds:>10,.0f} filas/s), "
+        f"RSS pico {peak_mb:5.0f} MiB (+{delta_mb:.0f}), archivo {os.path.getsize(file_name) / 2**20:6.1f} MiB"
+    )
+
+
+def main(params):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_name = os.path.join(tmp_dir, 'yellow_tripdata_2021-01.csv')
+        gz_name = f'{csv_name}.gz'
+        parquet_name = os.path.join(tmp_dir, 'yellow_tripdata_2021-01.parquet')
+        cache_name = os.path.join(tmp_dir, 'cache.parquet')
+
+        df = make_trips(params.rows)
+        df.to_csv(csv_name, index=False)
+        df.to_csv(gz_name, index=False)
+        df.to_parquet(parquet_name, index=False, row_group_size=params.chunksize)
+        del df
+        print(f"{params.rows:,} viajes sintéticos, chunks de {params.chunksize:,} filas")
+
+        measure('csv', csv_name, params.chunksize)
+        measure('csv.gz', gz_name, params.chunksize)
+        measure('csv + cache parquet', csv_name, params.chunksize, cache_name)
+        measure('parquet (cache)', cache_name, params.chunksize)
+        measure('parquet', parquet_name, params.chunksize)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de lectura CSV vs Parquet para ingest_data')
+    parser.add_argument('--rows', type=int, default=1000000, help='Viajes sintéticos')
+    parser.add_argument('--chunksize', type=int, default=ingest_data.DEFAULT_CHUNKSIZE, help='Filas por chunk')
+
+    main(parser.parse_args())
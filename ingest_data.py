@@ -1,15 +1,504 @@
-import pandas as pd
-#from sqlalchemy import create_engine
 import argparse
+import io
+import multiprocessing
 import os
-from sqlalchemy import create_engine
+import re
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from functools import partial
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from sqlalchemy import create_engine, text
+
+# cache de descargas compartido con los bloques de Mage (ahí es scheduler.utils.http_cache)
+from scheduler_data.scheduler.utils.http_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, cached_download
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # opcional: solo hace falta para fuentes .parquet y --parquet_cache
+    pa = None
+    pq = None
+
+# Ingesta de archivos mensuales de NY taxi (yellow/green, .csv, .csv.gz o
+# .parquet) a Postgres en memoria constante: la descarga se escribe a disco
+# por bloques, el archivo se lee en chunks con dtypes explícitos (Parquet por
+# row groups con pyarrow) y cada chunk entra con COPY.
+# Con --urls o --month-range los archivos se procesan en un pool de procesos
+# (descarga + parseo en paralelo) y como mucho --max_writers procesos hacen
+# COPY a la vez, para no saturar Postgres. Con --partitioned la tabla se
+# particiona por mes de pickup y cada archivo reemplaza solo su partición.
+
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+DEFAULT_CHUNKSIZE = 100000
+DEFAULT_MAX_WRITERS = 2
+# releases de DataTalksClub con los CSV mensuales de TLC (TLC solo publica Parquet)
+DEFAULT_URL_TEMPLATE = (
+    'https://github.com/DataTalksClub/nyc-tlc-data/releases/download/'
+    '{taxi_type}/{taxi_type}_tripdata_{month}.csv.gz'
+)
+TLC_PARQUET_URL_TEMPLATE = 'https://d37ci6vzurychx.cloudfront.net/trip-data/{taxi_type}_tripdata_{month}.parquet'
+SOURCE_EXTENSIONS = ('.csv', '.csv.gz', '.parquet')
+
+# dtypes de las columnas conocidas de TLC; enteros nullable porque los
+# meses con viajes de tipo "unknown" traen VendorID/passenger_count vacíos
+TAXI_DTYPES = {
+    'VendorID': 'Int64',
+    'passenger_count': 'Int64',
+    'trip_distance': 'float64',
+    'RatecodeID': 'Int64',
+    'store_and_fwd_flag': 'string',
+    'PULocationID': 'Int64',
+    'DOLocationID': 'Int64',
+    'payment_type': 'Int64',
+    'trip_type': 'Int64',
+    'fare_amount': 'float64',
+    'extra': 'float64',
+    'mta_tax': 'float64',
+    'tip_amount': 'float64',
+    'tolls_amount': 'float64',
+    'ehail_fee': 'float64',
+    'improvement_surcharge': 'float64',
+    'total_amount': 'float64',
+    'congestion_surcharge': 'float64',
+    'airport_fee': 'float64',
+}
+TAXI_DATETIME_COLUMNS = [
+    'tpep_pickup_datetime',
+    'tpep_dropoff_datetime',
+    'lpep_pickup_datetime',
+    'lpep_dropoff_datetime',
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss viene en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def download_file(url, file_name):
+    """
+    Descarga url a file_name por bloques (nunca tiene el archivo completo
+    en memoria). Devuelve los bytes escritos.
+    """
+    print(f"Descargando {url} ...")
+    start_time = time.time()
+    written = 0
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(file_name, 'wb') as f:
+            for block in response.iter_content(chunk_size=DOWNLOAD_BLOCK_SIZE):
+                f.write(block)
+                written += len(block)
+    print(f"Archivo guardado como {file_name}: {written / 2**20:.1f} MiB en {time.time() - start_time:.2f}s")
+    return written
+
+
+def read_csv_chunks(csv_name, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Iterador de chunks del CSV con los dtypes de TAXI_DTYPES y las columnas
+    *_datetime parseadas (solo las que trae el archivo).
+    """
+    columns = pd.read_csv(csv_name, nrows=0).columns
+    dtypes = {column: dtype for column, dtype in TAXI_DTYPES.items() if column in columns}
+    parse_dates = [column for column in TAXI_DATETIME_COLUMNS if column in columns]
+    return pd.read_csv(
+        csv_name,
+        dtype=dtypes,
+        parse_dates=parse_dates,
+        chunksize=chunksize,
+    )
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise ImportError("Para leer o cachear Parquet hace falta pyarrow (pip install pyarrow)")
+
+
+def read_parquet_chunks(parquet_name, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Chunks de un Parquet leídos row group por row group (iter_batches), sin
+    parsear texto: solo se castean las columnas a TAXI_DTYPES para que el
+    esquema sea el mismo que con CSV.
+    """
+    _require_pyarrow()
+    parquet_file = pq.ParquetFile(parquet_name)
+    columns = parquet_file.schema_arrow.names
+    dtypes = {column: dtype for column, dtype in TAXI_DTYPES.items() if column in columns}
+    for batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield batch.to_pandas().astype(dtypes)
+
+
+def cache_parquet_chunks(chunks, parquet_name):
+    """
+    Deja pasar los chunks y a la vez los escribe en parquet_name (un row
+    group por chunk). El archivo aparece recién al terminar, así un corte a
+    mitad de camino no deja un cache incompleto.
+    """
+    _require_pyarrow()
+    tmp_name = f"{parquet_name}.tmp"
+    writer = None
+    try:
+        for df in chunks:
+            if writer is None:
+                schema = pa.Schema.from_pandas(df, preserve_index=False)
+                writer = pq.ParquetWriter(tmp_name, schema)
+            # mismo esquema en todos los chunks (un chunk todo nulo no cambia el tipo)
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            yield df
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_name, parquet_name)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def read_chunks(file_name, chunksize=DEFAULT_CHUNKSIZE, parquet_cache=None):
+    """
+    Chunks del archivo según su extensión. Con parquet_cache (ruta .parquet)
+    un CSV se guarda además como Parquet para las siguientes cargas.
+    """
+    if file_name.endswith('.parquet'):
+        return read_parquet_chunks(file_name, chunksize)
+    chunks = read_csv_chunks(file_name, chunksize)
+    if parquet_cache:
+        return cache_parquet_chunks(chunks, parquet_cache)
+    return chunks
+
+
+def parquet_cache_name(url, cache_dir):
+    # yellow_tripdata_2021-01.csv.gz -> <cache_dir>/yellow_tripdata_2021-01.parquet
+    file_name = os.path.basename(urlparse(url).path)
+    for extension in SOURCE_EXTENSIONS:
+        if file_name.endswith(extension):
+            file_name = file_name[:-len(extension)]
+            break
+    return os.path.join(cache_dir, f"{file_name}.parquet")
+
+
+# semáforo de escritores COPY y lock de creación de tabla, compartidos por
+# los procesos del pool (los asigna _init_worker)
+_writer_slots = None
+_table_lock = None
+
+
+def _init_worker(writer_slots, table_lock):
+    global _writer_slots, _table_lock
+    _writer_slots = writer_slots
+    _table_lock = table_lock
+
+
+def create_table(engine, df, table_name):
+    # tabla vacía con el esquema del primer chunk, si todavía no existe
+    with _table_lock or nullcontext():
+        df.head(0).to_sql(name=table_name, con=engine, if_exists='append', index=False)
+
+
+def copy_chunk(connection, df, table_name):
+    """
+    COPY de un chunk a table_name. Los nulos quedan como campo vacío sin
+    comillas, que en FORMAT csv es NULL.
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    columns = ', '.join(f'"{column}"' for column in df.columns)
+    # el parseo corre en paralelo; solo el COPY espera un lugar de escritor
+    with _writer_slots or nullcontext():
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY "{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+        connection.commit()
+
 
+def pickup_column(columns):
+    # tpep_* en yellow, lpep_* en green
+    for column in ('tpep_pickup_datetime', 'lpep_pickup_datetime'):
+        if column in columns:
+            return column
+    raise ValueError("El archivo no tiene columna de pickup (tpep/lpep_pickup_datetime)")
 
-#motor = create_engine('postgresql://root@localhost:5432/ny_taxi')
 
-#datos = pd.read_csv("https://s3.amazonaws.com/nys-tlc/trip+data/yellow_tripdata_2021-01.csv")
+def file_month(file_name, df, pickup):
+    # mes del nombre del archivo (..._2021-01.csv.gz) o, si no lo trae, el
+    # mes más frecuente del primer chunk
+    match = re.search(r'(\d{4}-\d{2})', os.path.basename(file_name))
+    if match:
+        return pd.Period(match.group(1), freq='M')
+    return df[pickup].dt.to_period('M').mode()[0]
+
+
+def partition_name(table_name, month):
+    return f"{table_name}_{month.year}_{month.month:02d}"
+
+
+def create_partitioned_table(engine, df, table_name, pickup):
+    """
+    Tabla padre particionada por rango de pickup (esquema del primer chunk),
+    si todavía no existe. Las particiones son mensuales. Falla si ya existe
+    una tabla común con ese nombre (cargada sin --partitioned).
+    """
+    with _table_lock or nullcontext():
+        with engine.begin() as conn:
+            relkind = conn.execute(
+                text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {'t': table_name}
+            ).scalar()
+            if relkind is None:
+                ddl = pd.io.sql.get_schema(df.head(0), table_name, con=conn)
+                conn.execute(text(f'{ddl} PARTITION BY RANGE ("{pickup}")'))
+            elif relkind != 'p':
+                raise ValueError(
+                    f"La tabla {table_name} ya existe y no está particionada (se cargó sin "
+                    f"--partitioned); borrarla o usar otro --table_name para cargarla particionada"
+                )
+
+
+def create_load_partition(connection, table_name, month, pickup):
+    """
+    Tabla de carga del mes, fuera de la tabla padre: se llena con COPY sin
+    índices y con un CHECK con los límites del mes (y pickup NOT NULL, como
+    exige la partición), para que el ATTACH no tenga que recorrerla.
+    """
+    load_table = f"{partition_name(table_name, month)}_load"
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{load_table}"')
+        cursor.execute(f'CREATE TABLE "{load_table}" (LIKE "{table_name}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'ALTER TABLE "{load_table}" ADD CONSTRAINT "{load_table}_bounds" '
+            f'CHECK ("{pickup}" IS NOT NULL AND "{pickup}" >= %s AND "{pickup}" < %s)',
+            (month.start_time, (month + 1).start_time)
+        )
+    connection.commit()
+    return load_table
+
+
+def swap_partition(connection, table_name, month, pickup):
+    """
+    Indexa la tabla de carga del mes y la pone en lugar de la partición
+    actual (DETACH + DROP + ATTACH) en una sola transacción: las consultas
+    ven el mes anterior completo o el nuevo completo.
+    """
+    partition = partition_name(table_name, month)
+    load_table = f"{partition}_load"
+    indexes = {'pickup': pickup, 'pulocation': 'PULocationID'}
+    with connection.cursor() as cursor:
+        # índices después de la carga: el COPY no mantiene índices fila por fila
+        for suffix, column in indexes.items():
+            cursor.execute(f'CREATE INDEX "{load_table}_{suffix}_idx" ON "{load_table}" ("{column}")')
+        cursor.execute(f'ANALYZE "{load_table}"')
+
+        cursor.execute("SELECT to_regclass(%s)", (partition,))
+        if cursor.fetchone()[0] is not None:
+            cursor.execute(f'ALTER TABLE "{table_name}" DETACH PARTITION "{partition}"')
+            cursor.execute(f'DROP TABLE "{partition}"')
+        cursor.execute(f'ALTER TABLE "{load_table}" RENAME TO "{partition}"')
+        for suffix in indexes:
+            cursor.execute(f'ALTER INDEX "{load_table}_{suffix}_idx" RENAME TO "{partition}_{suffix}_idx"')
+        cursor.execute(
+            f'ALTER TABLE "{table_name}" ATTACH PARTITION "{partition}" FOR VALUES FROM (%s) TO (%s)',
+            (month.start_time, (month + 1).start_time)
+        )
+        cursor.execute(f'ALTER TABLE "{partition}" DROP CONSTRAINT "{load_table}_bounds"')
+    connection.commit()
+    return partition
+
+
+def ingest_file(engine, file_name, table_name, chunksize=DEFAULT_CHUNKSIZE, label='', partitioned=False,
+                parquet_cache=None):
+    """
+    Carga file_name (CSV o Parquet) completo en table_name chunk por chunk;
+    con parquet_cache un CSV queda además cacheado como Parquet. Con partitioned
+    el archivo reemplaza la partición de su mes (el resto de los meses no se
+    toca) y las filas con pickup fuera de ese mes se descartan. Devuelve un
+    resumen con filas, duración, filas/s y pico de RSS.
+    """
+    start_time = time.time()
+    total_rows = 0
+    out_of_month = 0
+    target_table = table_name
+    connection = engine.raw_connection()
+    try:
+        chunk_start = time.time()
+        for chunk_number, df in enumerate(read_chunks(file_name, chunksize, parquet_cache), start=1):
+            # el tiempo del chunk incluye la lectura del archivo y el COPY
+            if chunk_number == 1 and partitioned:
+                pickup = pickup_column(df.columns)
+                month = file_month(file_name, df, pickup)
+                create_partitioned_table(engine, df, table_name, pickup)
+                target_table = create_load_partition(connection, table_name, month, pickup)
+            elif chunk_number == 1:
+                create_table(engine, df, table_name)
+            if partitioned:
+                in_month = df[pickup].dt.to_period('M') == month
+                out_of_month += int((~in_month).sum())
+                df = df[in_month]
+            copy_chunk(connection, df, target_table)
+            total_rows += len(df)
+            chunk_seconds = time.time() - chunk_start
+            print(
+                f"{label}Chunk {chunk_number}: {len(df)} filas en {chunk_seconds:.2f}s "
+                f"({len(df) / chunk_seconds:,.0f} filas/s), RSS pico {peak_rss_mb():.0f} MiB"
+            )
+            chunk_start = time.time()
+
+        if partitioned and target_table != table_name:
+            swap_start = time.time()
+            partition = swap_partition(connection, table_name, month, pickup)
+            print(
+                f"{label}Partición {partition} reemplazada en {time.time() - swap_start:.2f}s "
+                f"({out_of_month} filas fuera de {month} descartadas)"
+            )
+    finally:
+        connection.close()
+
+    duration = time.time() - start_time
+    summary = {
+        'rows': total_rows,
+        'out_of_month_rows': out_of_month,
+        'duration_seconds': round(duration, 2),
+        'rows_per_second': round(total_rows / duration) if duration else 0,
+        'peak_rss_mb': round(peak_rss_mb()),
+    }
+    print(
+        f"{label}Carga {table_name}: {summary['rows']} filas en {summary['duration_seconds']:.2f}s "
+        f"({summary['rows_per_second']:,} filas/s), RSS pico {summary['peak_rss_mb']} MiB"
+    )
+    return summary
+
+
+def month_range_urls(start_month, end_month, taxi_type='yellow', url_template=DEFAULT_URL_TEMPLATE):
+    # '2021-01' '2021-12' -> una URL por mes, ambos extremos incluidos
+    months = pd.period_range(start_month, end_month, freq='M')
+    if len(months) == 0:
+        raise ValueError(f"Rango de meses vacío: {start_month} -> {end_month}")
+    return [url_template.format(taxi_type=taxi_type, month=str(month)) for month in months]
+
+
+def local_file_name(url, data_dir='.'):
+    # cada archivo con su nombre de origen, así los procesos no se pisan
+    file_name = os.path.basename(urlparse(url).path)
+    if not file_name.endswith(SOURCE_EXTENSIONS):
+        file_name = 'raw_data.csv.gz' if url.endswith('.gz') else 'raw_data.csv'
+    return os.path.join(data_dir, file_name)
+
+
+def ingest_url(url_conn, url, table_name, chunksize=DEFAULT_CHUNKSIZE, data_dir='.', partitioned=False,
+               parquet_cache_dir=None, http_cache_dir=None, http_cache_max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Descarga y carga un archivo (corre dentro de un proceso del pool). Con
+    http_cache_dir la descarga pasa por el cache HTTP (utils/http_cache.py:
+    un archivo sin cambios en el servidor no se vuelve a bajar). Con
+    parquet_cache_dir un CSV ya cacheado como Parquet se carga desde el
+    cache, sin descargarlo ni parsearlo. Devuelve el resumen de ingest_file
+    con la url y los tiempos de descarga.
+    """
+    label = f"[{os.path.basename(urlparse(url).path)}] "
+    start_time = time.time()
+    parquet_cache = None
+    if parquet_cache_dir and not urlparse(url).path.endswith('.parquet'):
+        parquet_cache = parquet_cache_name(url, parquet_cache_dir)
+    if parquet_cache and os.path.exists(parquet_cache):
+        print(f"{label}Usando cache Parquet {parquet_cache}")
+        file_name = parquet_cache
+        parquet_cache = None
+    else:
+        file_name = local_file_name(url, data_dir)
+        if http_cache_dir:
+            cached_download(url, file_name, http_cache_dir, http_cache_max_bytes)
+        else:
+            download_file(url, file_name)
+    download_seconds = time.time() - start_time
+
+    engine = create_engine(url_conn)
+    try:
+        summary = ingest_file(engine, file_name, table_name, chunksize, label, partitioned, parquet_cache)
+    finally:
+        engine.dispose()
+    summary.update({
+        'url': url,
+        'download_seconds': round(download_seconds, 2),
+        'total_seconds': round(time.time() - start_time, 2),
+    })
+    return summary
+
+
+def ingest_urls(url_conn, urls, table_name, chunksize=DEFAULT_CHUNKSIZE, workers=None,
+                max_writers=DEFAULT_MAX_WRITERS, data_dir='.', partitioned=False, parquet_cache_dir=None,
+                http_cache_dir=None, http_cache_max_bytes=DEFAULT_MAX_BYTES, replace=False):
+    """
+    Carga urls en table_name. Sin partitioned las filas se agregan a la
+    tabla (volver a cargar un mes lo duplica); con partitioned cada archivo
+    reemplaza solo la partición de su mes. Con replace la tabla se borra
+    completa antes de cargar. Con más de un archivo y workers > 1 cada
+    archivo va a un proceso del pool. Devuelve los resúmenes por archivo en
+    el orden de urls.
+    """
+    if parquet_cache_dir:
+        _require_pyarrow()
+        os.makedirs(parquet_cache_dir, exist_ok=True)
+    if replace:
+        print(f"Borrando la tabla {table_name} antes de cargar (--replace)")
+        engine = create_engine(url_conn)
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+        engine.dispose()
+
+    load_url = partial(
+        ingest_url, url_conn,
+        table_name=table_name,
+        chunksize=chunksize,
+        data_dir=data_dir,
+        partitioned=partitioned,
+        parquet_cache_dir=parquet_cache_dir,
+        http_cache_dir=http_cache_dir,
+        http_cache_max_bytes=http_cache_max_bytes,
+    )
+    workers = min(workers or os.cpu_count() or 1, len(urls))
+    start_time = time.time()
+    if workers == 1:
+        summaries = [load_url(url) for url in urls]
+    else:
+        print(f"Cargando {len(urls)} archivos con {workers} procesos y hasta {max_writers} COPY a la vez")
+        summaries_by_url = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(multiprocessing.BoundedSemaphore(max_writers), multiprocessing.Lock()),
+        ) as pool:
+            futures = {pool.submit(load_url, url): url for url in urls}
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries_by_url[summary['url']] = summary
+                print(
+                    f"Archivo listo {len(summaries_by_url)}/{len(urls)}: {summary['url']} "
+                    f"({summary['rows']} filas, descarga {summary['download_seconds']:.2f}s, "
+                    f"total {summary['total_seconds']:.2f}s)"
+                )
+        summaries = [summaries_by_url[url] for url in urls]
+
+    duration = time.time() - start_time
+    total_rows = sum(summary['rows'] for summary in summaries)
+    print("Resumen por archivo:")
+    for summary in summaries:
+        print(
+            f"  {os.path.basename(urlparse(summary['url']).path)}: {summary['rows']} filas, "
+            f"descarga {summary['download_seconds']:.2f}s, total {summary['total_seconds']:.2f}s, "
+            f"RSS pico {summary['peak_rss_mb']} MiB"
+        )
+    print(
+        f"Carga {table_name}: {total_rows} filas de {len(urls)} archivos en {duration:.2f}s "
+        f"({total_rows / duration:,.0f} filas/s)"
+    )
+    return summaries
 
-#datos.head()
 
 def main(params):
     user = params.user
@@ -18,37 +507,32 @@ def main(params):
     port = params.port
     db = params.db
     table_name = params.table_name
-    url = params.url
-    
-    #url pasada para que se genere el gz cuando se ejecute el archivo 
-    if url.endswith('.csv.gz'):
-        csv_name = 'raw_data.csv.gz'
-    else:
-        csv_name = 'raw_data.csv'
-
-
-    #os.system(f'wget {url} -O {csv_name}')  
-    
-    import requests
-    print(f"Descargando {url} ...")
-    r = requests.get(url)
-    with open(csv_name, "wb") as f:
-        f.write(r.content)
-    print(f"Archivo guardado como {csv_name}")
-
-    url_conn = f'postgresql://{user}:{password}@{host}:{port}/{db}'
-    
-    engine = create_engine(url_conn)
 
-    data_raw_iter = pd.read_csv(csv_name, iterator=True, chunksize=1000000)
+    if params.month_range:
+        urls = month_range_urls(*params.month_range, taxi_type=params.taxi_type, url_template=params.url_template)
+    elif params.urls:
+        urls = params.urls
+    else:
+        urls = [params.url]
 
-    data_raw = next(data_raw_iter)
+    url_conn = f'postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}'
 
-    print(data_raw.head())
+    ingest_urls(
+        url_conn, urls, table_name,
+        chunksize=params.chunksize,
+        workers=params.workers,
+        max_writers=params.max_writers,
+        data_dir=params.data_dir,
+        partitioned=params.partitioned,
+        parquet_cache_dir=params.parquet_cache,
+        http_cache_dir=None if params.no_http_cache else params.http_cache,
+        http_cache_max_bytes=int(params.http_cache_max_gb * 2**30),
+        replace=params.replace,
+    )
 
 if __name__  == '__main__':
 
-    parser = argparse.ArgumentParser(description='Ingesta de datos de CSV a Postgres')
+    parser = argparse.ArgumentParser(description='Ingesta de datos de CSV/Parquet a Postgres')
 
     parser.add_argument('--user', required=True, help='Username para la bd en postgres')
     parser.add_argument('--password', required=True, help='Password para la bd en postgres')
@@ -56,8 +540,33 @@ if __name__  == '__main__':
     parser.add_argument('--port', required=True, help='Port para la bd en postgres')
     parser.add_argument('--db', required=True, help='DB para la bd en postgres')
     parser.add_argument('--table_name', required=True, help='Table para la bd en postgres')
-    parser.add_argument('--url', required=True, help='URL para la bd en postgres')
+    sources = parser.add_mutually_exclusive_group(required=True)
+    sources.add_argument('--url', help='URL del archivo CSV o Parquet a cargar')
+    sources.add_argument('--urls', nargs='+', help='Varias URLs de CSV/Parquet, cargadas en paralelo')
+    sources.add_argument('--month-range', dest='month_range', nargs=2, metavar=('DESDE', 'HASTA'),
+                         help='Meses YYYY-MM (inclusive) a cargar con --url_template')
+    parser.add_argument('--taxi_type', default='yellow', help='yellow o green, para --month-range')
+    parser.add_argument('--url_template', default=DEFAULT_URL_TEMPLATE,
+                        help='Plantilla de URL para --month-range ({taxi_type}, {month}); '
+                             f'para los Parquet de TLC: {TLC_PARQUET_URL_TEMPLATE}')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='Filas por chunk de lectura/COPY')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos del pool (por defecto, uno por CPU)')
+    parser.add_argument('--max_writers', type=int, default=DEFAULT_MAX_WRITERS,
+                        help='Procesos haciendo COPY a la vez')
+    parser.add_argument('--data_dir', default='.', help='Carpeta para los archivos descargados')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='Tabla particionada por mes de pickup; cada archivo reemplaza solo su mes')
+    parser.add_argument('--replace', action='store_true',
+                        help='Borrar la tabla completa antes de cargar; sin esta opción (y sin --partitioned) '
+                             'las filas se agregan a la tabla existente')
+    parser.add_argument('--parquet_cache', default=None,
+                        help='Carpeta donde cachear los CSV como Parquet; las siguientes cargas no parsean CSV')
+    parser.add_argument('--http_cache', default=DEFAULT_CACHE_DIR,
+                        help='Carpeta del cache de descargas (revalida con ETag/Last-Modified)')
+    parser.add_argument('--http_cache_max_gb', type=float, default=DEFAULT_MAX_BYTES / 2**30,
+                        help='Tamaño máximo del cache de descargas; se borran los archivos menos usados')
+    parser.add_argument('--no_http_cache', action='store_true', help='Descargar siempre, sin cache')
 
     args = parser.parse_args()
 
-    main(args)
\ No newline at end of file
+    main(args)
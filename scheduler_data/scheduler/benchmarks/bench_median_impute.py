@@ -0,0 +1,110 @@
+# Benchmark: imputación con la mediana en fill_in_missing_values. Compara
+# la versión anterior (sorted(tolist()) y fillna con copia por columna, que
+# además tomaba la mediana de arriba) con utils/median_imputer: medianas
+# exactas en una pasada, por Pclass y aproximadas por chunks. Al final,
+# una corrida incremental: recalcular todo con el batch nuevo vs aplicar el
+# modelo guardado (load_imputer) sumándole solo el batch; con 500k filas de
+# historia empatan (~0.07s), la diferencia aparece con millones de filas.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_median_impute --rows 5000000
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from scheduler.utils.median_imputer import (
+    column_medians,
+    fill_with_medians,
+    grouped_medians,
+    load_imputer,
+    streaming_medians,
+)
+
+
+def make_passengers(rows, seed=0):
+    # columnas numéricas de titanic; ~20% de Age y ~1% de Fare nulos
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Age': rng.normal(30, 14, rows).clip(0.4, 80).round(1),
+        'Fare': rng.exponential(32, rows).round(4),
+        'Parch': rng.integers(0, 4, rows),
+        'Pclass': rng.integers(1, 4, rows),
+        'SibSp': rng.integers(0, 5, rows),
+        'Survived': rng.integers(0, 2, rows),
+    })
+    df.loc[rng.random(rows) < 0.2, 'Age'] = np.nan
+    df.loc[rng.random(rows) < 0.01, 'Fare'] = np.nan
+    return df
+
+
+def fill_before(df):
+    for col in df.columns:
+        values = sorted(df[col].dropna().tolist())
+        median_value = values[math.floor(len(values) / 2)]
+        df[[col]] = df[[col]].fillna(median_value)
+    return df
+
+
+def fill_exact(df):
+    return fill_with_medians(df, column_medians(df))
+
+
+def fill_grouped(df):
+    return fill_with_medians(df, grouped_medians(df, 'Pclass'), 'Pclass', fallback=column_medians(df))
+
+
+def fill_streaming(df, chunk_rows):
+    chunks = (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+    return streaming_medians(chunks).fill(df)
+
+
+def run(label, fill, df, expected_age):
+    # expected_age: mediana real de Age para cada fila (global o de su grupo)
+    data = df.copy()
+    started = time.perf_counter()
+    filled = fill(data)
+    seconds = time.perf_counter() - started
+    missing = df['Age'].isna()
+    error = (filled.loc[missing, 'Age'] - expected_age[missing]).abs().max()
+    print(f"{label:>22}: {seconds:6.2f}s, error máx. de Age imputada = {error:.4f}")
+
+
+def main(params):
+    df = make_passengers(params.rows)
+    global_age = pd.Series(df['Age'].median(), index=df.index)
+    group_age = df.groupby('Pclass')['Age'].transform('median')
+    print(f"{params.rows:,} filas sintéticas, {df.isna().sum().sum():,} nulos")
+
+    run('antes (sorted/tolist)', fill_before, df, global_age)
+    run('nanmedian + fillna', fill_exact, df, global_age)
+    run('por Pclass', fill_grouped, df, group_age)
+    run(f'streaming ({params.chunk_rows:,})', lambda data: fill_streaming(data, params.chunk_rows), df, global_age)
+
+    # corrida incremental: df es la historia y llega un batch nuevo
+    batch = make_passengers(params.new_rows, seed=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, 'medians.json')
+        load_imputer(model_path, df, mode='refit')
+        print(f"Modelo guardado: {os.path.getsize(model_path) / 1024:.0f} KiB; batch nuevo de {params.new_rows:,} filas")
+
+        started = time.perf_counter()
+        fill_exact(pd.concat([df, batch], ignore_index=True))
+        print(f"{'recalcular historia':>22}: {time.perf_counter() - started:6.2f}s")
+
+        started = time.perf_counter()
+        load_imputer(model_path, batch, mode='update').fill(batch.copy())
+        print(f"{'modelo + update':>22}: {time.perf_counter() - started:6.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de imputación con la mediana')
+    parser.add_argument('--rows', type=int, default=5000000, help='Filas sintéticas')
+    parser.add_argument('--chunk_rows', type=int, default=500000, help='Filas por chunk en modo streaming')
+    parser.add_argument('--new_rows', type=int, default=100000, help='Filas del batch nuevo en la corrida incremental')
+
+    main(parser.parse_args())
@@ -0,0 +1,60 @@
+# Benchmark: motor sync (secuencial y con hilos) vs motor async
+# (utils/qb_async) contra el stub local con latencia y 429 inyectados.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_async --latency 0.1 --error_rate 0.05
+import argparse
+import time
+
+from scheduler.benchmarks.bench_qb_chunks import FECHA_FIN, FECHA_INICIO, build_timeline, make_process_chunk
+from scheduler.benchmarks.qb_stub_server import QBStubServer
+from scheduler.utils.qb_async import run_chunks_async
+from scheduler.utils.qb_chunks import build_chunks, run_chunks
+from scheduler.utils.qb_rate_limit import disable_rate_limiter, get_rate_limiter
+
+
+def main(params):
+    timeline = build_timeline(params.quiet_rows_per_day, params.busy_rows)
+    server = QBStubServer(latency=params.latency, error_rate=params.error_rate, timeline=timeline).start()
+    # el benchmark mide el motor, no el presupuesto de 500 requests/min de QBO
+    if params.requests_per_minute:
+        get_rate_limiter('stub-realm', params.requests_per_minute)
+    else:
+        disable_rate_limiter('stub-realm')
+    chunks = build_chunks(FECHA_INICIO, FECHA_FIN, params.chunk_days)
+    process_chunk = make_process_chunk(server.base_url)
+
+    runs = [
+        ('sync x1', lambda: run_chunks(chunks, process_chunk, 1)),
+        (f'sync x{params.concurrency} hilos', lambda: run_chunks(chunks, process_chunk, params.concurrency)),
+        (f'async x{params.concurrency}', lambda: run_chunks_async(
+            'stub-realm', 'stub-token', server.base_url, 75, 'Invoice', chunks, params.concurrency
+        )),
+    ]
+    try:
+        for label, run in runs:
+            requests_before = server.request_count
+            start = time.perf_counter()
+            results = run()
+            seconds = time.perf_counter() - start
+            rows = sum(log['filas_procesadas'] for _, log in results)
+            errors = len([log for _, log in results if log['status'] == 'error'])
+            print(
+                f"{label:>16}: {len(chunks)} chunks, {server.request_count - requests_before} requests, "
+                f"{rows:,} filas, {errors} chunks con error, {seconds:.2f}s"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark motor sync vs async')
+    parser.add_argument('--chunk_days', type=float, default=7, help='Días por chunk')
+    parser.add_argument('--concurrency', type=int, default=8, help='Hilos / requests en vuelo')
+    parser.add_argument('--quiet_rows_per_day', type=int, default=5, help='Filas promedio por día tranquilo')
+    parser.add_argument('--busy_rows', type=int, default=20000, help='Filas de cada semana pico')
+    parser.add_argument('--latency', type=float, default=0.1, help='Latencia por request (s)')
+    parser.add_argument('--error_rate', type=float, default=0.05, help='Fracción de requests con 429')
+    parser.add_argument('--requests_per_minute', type=int, default=0, help='Presupuesto del rate limiter (0 = sin límite)')
+
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+# Benchmark: re-extracción completa paginada vs modo incremental CDC contra
+# el stub local (requests, filas transferidas y tiempo).
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_cdc --rows 20000 --changed 200 --latency 0.05
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from scheduler.benchmarks.qb_stub_server import QBStubServer
+from scheduler.utils.qb_cdc import fetch_cdc_changes
+from scheduler.utils.qb_client import fetch_qb_data
+from scheduler.utils.qb_rate_limit import disable_rate_limiter
+
+ENTITIES = ['Invoice', 'Customer', 'Item']
+
+
+def _full_pull(base_url, entity, page_size):
+    rows = 0
+    start_position = 1
+    while True:
+        query = f"SELECT * FROM {entity} STARTPOSITION {start_position} MAXRESULTS {page_size}"
+        batch = fetch_qb_data('stub-realm', 'stub-token', query, base_url, 75)
+        batch = batch.get('QueryResponse', {}).get(entity, [])
+        rows += len(batch)
+        if len(batch) < page_size:
+            return rows
+        start_position += page_size
+
+
+def main(params):
+    server = QBStubServer(
+        total_rows=params.rows, latency=params.latency, cdc_rows=params.changed
+    ).start()
+    disable_rate_limiter('stub-realm')
+    try:
+        requests_before = server.request_count
+        start = time.perf_counter()
+        full_rows = sum(_full_pull(server.base_url, entity, 1000) for entity in ENTITIES)
+        full_seconds = time.perf_counter() - start
+        full_requests = server.request_count - requests_before
+
+        requests_before = server.request_count
+        start = time.perf_counter()
+        changed_since = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+        changes, server_time = fetch_cdc_changes(
+            'stub-realm', 'stub-token', server.base_url, 75, ENTITIES, changed_since
+        )
+        cdc_seconds = time.perf_counter() - start
+        cdc_requests = server.request_count - requests_before
+        cdc_rows = sum(len(records) for records in changes.values())
+        deleted = sum(
+            1 for records in changes.values() for record in records if record.get('status') == 'Deleted'
+        )
+
+        print(f"completo: {full_rows:,} filas, {full_requests} requests, {full_seconds:.2f}s")
+        print(
+            f"CDC     : {cdc_rows:,} filas ({deleted} borrados), {cdc_requests} requests, "
+            f"{cdc_seconds:.2f}s, high-water mark {server_time}"
+        )
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de extracción completa vs CDC')
+    parser.add_argument('--rows', type=int, default=20000, help='Filas por entidad en el stub')
+    parser.add_argument('--changed', type=int, default=200, help='Registros cambiados por entidad')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latencia por request (s)')
+
+    main(parser.parse_args())
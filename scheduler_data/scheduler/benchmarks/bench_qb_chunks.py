@@ -0,0 +1,104 @@
+# Benchmark: requests y tiempo de un backfill con chunk_days fijo vs
+# segmentación adaptativa (utils/qb_chunks.run_adaptive_chunks), contra el
+# stub local con un año de datos: meses tranquilos y un par de semanas pico.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_chunks --latency 0.05
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from scheduler.benchmarks.qb_stub_server import QBStubServer
+from scheduler.utils.qb_chunks import build_chunks, run_adaptive_chunks, run_chunks
+from scheduler.utils.qb_client import fetch_qb_data
+from scheduler.utils.qb_rate_limit import disable_rate_limiter
+
+FECHA_INICIO = '2024-01-01T00:00:00-00:00'
+FECHA_FIN = '2025-01-01T00:00:00-00:00'
+
+
+def build_timeline(quiet_rows_per_day, busy_rows, seed=7):
+    # LastUpdatedTime de cada fila: goteo diario + dos semanas con busy_rows filas
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    timeline = []
+    for day in range(366):
+        for _ in range(rng.randint(0, 2 * quiet_rows_per_day)):
+            timeline.append(start + timedelta(days=day, seconds=rng.randint(0, 86399)))
+    for busy_start in (datetime(2024, 3, 25, tzinfo=timezone.utc), datetime(2024, 11, 25, tzinfo=timezone.utc)):
+        for _ in range(busy_rows):
+            timeline.append(busy_start + timedelta(seconds=rng.randint(0, 7 * 86400 - 1)))
+    return sorted(timeline)
+
+
+def make_process_chunk(base_url, page_size=1000):
+    # misma forma de resultado que _process_chunk de los loaders: (filas, log)
+    def process_chunk(chunk):
+        start = time.time()
+        rows = 0
+        pages = 0
+        start_position = chunk['start_position']
+        while True:
+            query = (
+                f"SELECT * FROM Invoice "
+                f"WHERE Metadata.LastUpdatedTime >= '{chunk['chunk_start']}' "
+                f"AND Metadata.LastUpdatedTime < '{chunk['chunk_end']}' "
+                f"STARTPOSITION {start_position} MAXRESULTS {page_size}"
+            )
+            data = fetch_qb_data('stub-realm', 'stub-token', query, base_url, 75)
+            batch = data.get('QueryResponse', {}).get('Invoice', [])
+            if not batch:
+                break
+            rows += len(batch)
+            pages += 1
+            if len(batch) < page_size:
+                break
+            start_position += page_size
+        return [], {
+            'filas_procesadas': rows,
+            'paginas_leidas': pages,
+            'duracion_segundos': time.time() - start,
+            'status': 'success',
+        }
+    return process_chunk
+
+
+def main(params):
+    timeline = build_timeline(params.quiet_rows_per_day, params.busy_rows)
+    server = QBStubServer(latency=params.latency, timeline=timeline).start()
+    disable_rate_limiter('stub-realm')
+    process_chunk = make_process_chunk(server.base_url)
+    try:
+        for label in ('fijo', 'adaptativo'):
+            requests_before = server.request_count
+            start = time.perf_counter()
+            if label == 'fijo':
+                chunks = build_chunks(FECHA_INICIO, FECHA_FIN, params.chunk_days)
+                results = run_chunks(chunks, process_chunk, params.max_parallel_chunks)
+            else:
+                chunks, results, _ = run_adaptive_chunks(
+                    FECHA_INICIO, FECHA_FIN, process_chunk, params.chunk_days,
+                    max_parallel_chunks=params.max_parallel_chunks,
+                    target_rows=params.target_rows
+                )
+            seconds = time.perf_counter() - start
+            rows = sum(log['filas_procesadas'] for _, log in results)
+            print(
+                f"{label:>10}: {len(chunks)} chunks, {server.request_count - requests_before} requests, "
+                f"{rows:,} filas, {seconds:.2f}s"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de chunk_days fijo vs adaptativo')
+    parser.add_argument('--chunk_days', type=float, default=7, help='Tamaño inicial/fijo del chunk')
+    parser.add_argument('--target_rows', type=int, default=5000, help='Filas objetivo por chunk')
+    parser.add_argument('--quiet_rows_per_day', type=int, default=5, help='Filas promedio por día tranquilo')
+    parser.add_argument('--busy_rows', type=int, default=20000, help='Filas de cada semana pico')
+    parser.add_argument('--max_parallel_chunks', type=int, default=1, help='Chunks en paralelo')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latencia por request (s)')
+
+    main(parser.parse_args())
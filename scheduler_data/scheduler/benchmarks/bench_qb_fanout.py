@@ -0,0 +1,74 @@
+# Benchmark: paginación secuencial vs fan-out con COUNT(*) (utils/qb_pages)
+# para un chunk con muchas páginas, contra el stub local con latencia.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_fanout --rows 10000 --latency 0.2
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from scheduler.benchmarks.qb_stub_server import QBStubServer
+from scheduler.utils.qb_client import fetch_qb_data
+from scheduler.utils.qb_pages import fetch_pages_fanout, window_query
+from scheduler.utils.qb_rate_limit import disable_rate_limiter, get_rate_limiter
+
+CHUNK_START = '2024-03-25T00:00:00-00:00'
+CHUNK_END = '2024-04-01T00:00:00-00:00'
+
+
+def fetch_pages_sequential(base_url, page_size=1000):
+    batches = []
+    start_position = 1
+    while True:
+        query = window_query('Invoice', CHUNK_START, CHUNK_END, start_position, page_size)
+        data = fetch_qb_data('stub-realm', 'stub-token', query, base_url, 75)
+        batch = data.get('QueryResponse', {}).get('Invoice', [])
+        if not batch:
+            break
+        batches.append(batch)
+        if len(batch) < page_size:
+            break
+        start_position += page_size
+    return batches
+
+
+def main(params):
+    # todas las filas dentro de la semana del chunk
+    start = datetime(2024, 3, 25, tzinfo=timezone.utc)
+    step = 7 * 86400 / params.rows
+    timeline = [start + timedelta(seconds=i * step) for i in range(params.rows)]
+    server = QBStubServer(latency=params.latency, timeline=timeline).start()
+    # el benchmark mide el motor, no el presupuesto de 500 requests/min de QBO
+    if params.requests_per_minute:
+        get_rate_limiter('stub-realm', params.requests_per_minute)
+    else:
+        disable_rate_limiter('stub-realm')
+
+    runs = [
+        ('secuencial', lambda: fetch_pages_sequential(server.base_url)),
+        ('fan-out', lambda: [batch for _, _, batch, _ in fetch_pages_fanout(
+            'stub-realm', 'stub-token', server.base_url, 75, 'Invoice', CHUNK_START, CHUNK_END
+        )]),
+    ]
+    try:
+        for label, run in runs:
+            requests_before = server.request_count
+            started = time.perf_counter()
+            batches = run()
+            seconds = time.perf_counter() - started
+            ids = [record['Id'] for batch in batches for record in batch]
+            print(
+                f"{label:>10}: {len(batches)} páginas, {server.request_count - requests_before} requests, "
+                f"{len(ids):,} filas (en orden: {ids == sorted(ids, key=int)}), {seconds:.2f}s"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark paginación secuencial vs fan-out')
+    parser.add_argument('--rows', type=int, default=10000, help='Filas en la ventana del chunk')
+    parser.add_argument('--latency', type=float, default=0.2, help='Latencia por request (s)')
+    parser.add_argument('--requests_per_minute', type=int, default=0, help='Presupuesto del rate limiter (0 = sin límite)')
+
+    main(parser.parse_args())
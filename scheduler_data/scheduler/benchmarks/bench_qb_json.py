@@ -0,0 +1,109 @@
+# Micro-benchmark: armado del frame raw y del buffer COPY para payloads
+# sintéticos de QBO. Compara el camino anterior (json.dumps por entidad y por
+# fila para request_payload + to_csv, que re-escapa cada comilla del JSON)
+# con utils/qb_json (json u orjson, constantes una vez) + pg_bulk.encode_copy_buffer.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_json --rows 100000
+import argparse
+import io
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from scheduler.benchmarks.qb_stub_server import make_entity
+from scheduler.utils import qb_json
+from scheduler.utils.pg_bulk import encode_copy_buffer
+
+REQUEST_PAYLOAD = {'realm_id': 'stub-realm', 'minorversion': 75, 'entity': 'Invoice'}
+
+
+def make_invoice(entity_id):
+    # invoice con líneas, más parecida a un payload real que make_entity
+    invoice = make_entity('Invoice', entity_id)
+    invoice['Line'] = [
+        {
+            'Id': str(line),
+            'LineNum': line,
+            'Amount': 10.0 * line,
+            'DetailType': 'SalesItemLineDetail',
+            'Description': f'Servicio "{line}" para cliente, mes de marzo',
+            'SalesItemLineDetail': {'ItemRef': {'value': str(line), 'name': f'Item {line}'}, 'Qty': line},
+        }
+        for line in range(1, 4)
+    ]
+    return invoice
+
+
+def frame_before(records):
+    ingested_at_utc = datetime.utcnow().isoformat()
+    rows = []
+    for record in records:
+        rows.append({
+            "id": record.get("Id"),
+            "payload": json.dumps(record),
+            "ingested_at_utc": ingested_at_utc,
+            "page_number": 1,
+            "page_size": 1000,
+            "request_payload": json.dumps(REQUEST_PAYLOAD),
+        })
+    return pd.DataFrame(rows)
+
+
+def frame_after(records, dumps, dumps_many):
+    ingested_at_utc = datetime.utcnow().isoformat()
+    request_payload = dumps(REQUEST_PAYLOAD)
+    rows = []
+    for record, payload in zip(records, dumps_many(records)):
+        rows.append({
+            "id": record.get("Id"),
+            "payload": payload,
+            "ingested_at_utc": ingested_at_utc,
+            "page_number": 1,
+            "page_size": 1000,
+            "request_payload": request_payload,
+        })
+    return pd.DataFrame(rows)
+
+
+def csv_buffer(df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    return io.BytesIO(buffer.getvalue().encode('utf-8'))
+
+
+def run(label, build_frame, build_buffer, records):
+    started = time.perf_counter()
+    df = build_frame(records)
+    encoded = time.perf_counter()
+    buffer = build_buffer(df)
+    finished = time.perf_counter()
+    print(
+        f"{label:>22}: serializar {encoded - started:.2f}s + buffer COPY {finished - encoded:.2f}s "
+        f"= {finished - started:.2f}s, {len(buffer.getvalue()) / 2**20:.1f} MiB"
+    )
+
+
+def json_dumps(obj):
+    return json.dumps(obj, default=str, separators=(',', ':'), ensure_ascii=False)
+
+
+def main(params):
+    records = [make_invoice(i) for i in range(1, params.rows + 1)]
+    print(f"{params.rows:,} invoices sintéticas (motor JSON disponible: {qb_json.JSON_ENGINE})")
+
+    run('antes (json + to_csv)', frame_before, csv_buffer, records)
+    run('json + encoded', lambda r: frame_after(r, json_dumps, lambda rs: [json_dumps(x) for x in rs]),
+        encode_copy_buffer, records)
+    if qb_json.orjson is not None:
+        run('orjson + encoded', lambda r: frame_after(r, qb_json.dumps, qb_json.dumps_many),
+            encode_copy_buffer, records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de serialización JSON para las tablas raw')
+    parser.add_argument('--rows', type=int, default=100000, help='Invoices sintéticas')
+
+    main(parser.parse_args())
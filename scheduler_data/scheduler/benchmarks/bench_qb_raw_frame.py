@@ -0,0 +1,67 @@
+# Benchmark: frame raw armado fila por fila (lista de dicts con los mismos
+# valores del batch repetidos y un timestamp por entidad, como antes) vs por
+# columnas (utils/qb_raw.build_raw_frame), con dtypes numpy o Arrow.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_raw_frame --rows 200000
+import argparse
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from scheduler.benchmarks.qb_stub_server import make_entity
+from scheduler.utils.qb_json import dumps, dumps_many
+from scheduler.utils.qb_raw import build_raw_frame, resolve_dtype_backend
+
+BATCH_METADATA = {
+    'chunk_start': '2024-03-25T00:00:00-00:00',
+    'chunk_end': '2024-04-01T00:00:00-00:00',
+    'page_number': 3,
+    'page_size': 1000,
+}
+
+
+def build_rows_frame(records, batch_metadata, kwargs):
+    request_payload = dumps(kwargs.get("request_payload", {}))
+    return pd.DataFrame([
+        {
+            "id": record.get("Id"),
+            "payload": payload,
+            "ingested_at_utc": datetime.now(timezone.utc).isoformat(),
+            "extract_window_start_utc": batch_metadata["chunk_start"],
+            "extract_window_end_utc": batch_metadata["chunk_end"],
+            "page_number": batch_metadata["page_number"],
+            "page_size": batch_metadata["page_size"],
+            "request_payload": request_payload,
+        }
+        for record, payload in zip(records, dumps_many(records))
+    ])
+
+
+def run(label, build, records, kwargs):
+    started = time.perf_counter()
+    df = build(records, BATCH_METADATA, kwargs)
+    seconds = time.perf_counter() - started
+    memory = df.memory_usage(deep=True)
+    print(
+        f"{label:>18}: {seconds:.2f}s, {memory.sum() / 2**20:7.1f} MiB "
+        f"(sin payload/id {memory.drop(['Index', 'id', 'payload']).sum() / 2**20:5.1f} MiB)"
+    )
+
+
+def main(params):
+    records = [make_entity('Invoice', i) for i in range(1, params.rows + 1)]
+    print(f"{params.rows:,} invoices sintéticas")
+
+    run('filas (antes)', build_rows_frame, records, {})
+    run('columnas numpy', build_raw_frame, records, {})
+    if resolve_dtype_backend('pyarrow') == 'pyarrow':
+        run('columnas pyarrow', build_raw_frame, records, {'raw_dtype_backend': 'pyarrow'})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark del frame raw por filas vs por columnas')
+    parser.add_argument('--rows', type=int, default=200000, help='Entidades sintéticas')
+
+    main(parser.parse_args())
@@ -0,0 +1,60 @@
+# Benchmark: latencia por página con y sin reutilización de conexiones.
+#
+# Uso (desde scheduler_data/):
+#   python -m scheduler.benchmarks.bench_qb_session --pages 200
+import argparse
+import statistics
+import time
+
+import requests
+
+from scheduler.benchmarks.qb_stub_server import QBStubServer
+from scheduler.utils.qb_client import build_session, fetch_qb_data
+from scheduler.utils.qb_rate_limit import disable_rate_limiter
+
+
+def _run(base_url, pages, page_size, reuse):
+    session = build_session() if reuse else None
+    latencies = []
+    for page in range(pages):
+        query = (
+            f"SELECT * FROM Invoice "
+            f"STARTPOSITION {page * page_size + 1} MAXRESULTS {page_size}"
+        )
+        # sin reutilización: una Session nueva por página, igual que requests.get
+        page_session = session or requests.Session()
+        start = time.perf_counter()
+        fetch_qb_data('stub-realm', 'stub-token', query, base_url, 75, session=page_session)
+        latencies.append(time.perf_counter() - start)
+        if not reuse:
+            page_session.close()
+    if session is not None:
+        session.close()
+    return latencies
+
+
+def main(params):
+    server = QBStubServer(total_rows=params.pages * params.page_size).start()
+    # sin rate limiter: se mide la conexión, no el presupuesto de 500 requests/min
+    disable_rate_limiter('stub-realm')
+    try:
+        for reuse in (False, True):
+            connections_before = server.connection_count
+            latencies = _run(server.base_url, params.pages, params.page_size, reuse)
+            label = 'con reutilización' if reuse else 'sin reutilización'
+            print(
+                f"{label:>18}: {len(latencies)} páginas, "
+                f"media {statistics.mean(latencies) * 1000:.2f} ms, "
+                f"p95 {sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000:.2f} ms, "
+                f"conexiones {server.connection_count - connections_before}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de la Session compartida de QBO')
+    parser.add_argument('--pages', type=int, default=200, help='Páginas a pedir por modo')
+    parser.add_argument('--page_size', type=int, default=100, help='Filas por página')
+
+    main(parser.parse_args())
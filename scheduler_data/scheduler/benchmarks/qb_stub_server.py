@@ -0,0 +1,223 @@
+# Servidor HTTP local que imita los endpoints /v3/company/<realm>/query y
+# /v3/company/<realm>/cdc de QBO. Se usa solo en los benchmarks; responde
+# páginas sintéticas según STARTPOSITION/MAXRESULTS de la query y, en /cdc,
+# los últimos cdc_rows registros de cada entidad (1 de cada 10 borrado).
+# Con require_auth también imita el endpoint OAuth de Intuit y responde 401
+# a los access tokens que no emitió (o que se revocaron).
+import json
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_FROM_RE = re.compile(r'FROM\s+(\w+)', re.IGNORECASE)
+_START_RE = re.compile(r'STARTPOSITION\s+(\d+)', re.IGNORECASE)
+_MAX_RE = re.compile(r'MAXRESULTS\s+(\d+)', re.IGNORECASE)
+_SINCE_RE = re.compile(r">=\s*'([^']+)'")
+_UNTIL_RE = re.compile(r"<\s*'([^']+)'")
+
+CDC_MAX_RESULTS = 1000
+
+
+def _parse_qb_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def make_entity(entity, entity_id):
+    return {
+        'Id': str(entity_id),
+        'SyncToken': '0',
+        'DocNumber': f'{entity[:3].upper()}-{entity_id}',
+        'TxnDate': '2025-03-01',
+        'TotalAmt': round(entity_id * 1.5, 2),
+        'CustomerRef': {'value': str(entity_id % 50), 'name': f'Cliente {entity_id % 50}'},
+        'MetaData': {
+            'CreateTime': '2025-03-01T10:00:00-08:00',
+            'LastUpdatedTime': '2025-03-02T10:00:00-08:00',
+        },
+    }
+
+
+def make_deleted_entity(entity_id):
+    # forma en que /cdc devuelve los borrados: solo Id, status y MetaData
+    return {
+        'domain': 'QBO',
+        'status': 'Deleted',
+        'Id': str(entity_id),
+        'MetaData': {'LastUpdatedTime': '2025-03-03T10:00:00-08:00'},
+    }
+
+
+class QBStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que el cliente pueda mantener la conexión abierta
+    protocol_version = 'HTTP/1.1'
+    # evita la espera de Nagle/delayed-ACK entre cabeceras y cuerpo
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, extra_headers=None):
+        raw = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        server = self.server
+        server.record_request()
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(429, {'Fault': {'type': 'ThrottleExceeded'}}, {'Retry-After': '1'})
+            return
+
+        if server.access_tokens is not None:
+            token = self.headers.get('Authorization', '').replace('Bearer ', '')
+            if token not in server.access_tokens:
+                self._send_json(401, {'fault': {'type': 'AUTHENTICATION'}})
+                return
+
+        parsed = urlparse(self.path)
+        if parsed.path.endswith('/cdc'):
+            self._send_cdc(parse_qs(parsed.query))
+            return
+
+        query = parse_qs(parsed.query).get('query', [''])[0]
+        entity_match = _FROM_RE.search(query)
+        entity = entity_match.group(1) if entity_match else 'Invoice'
+
+        # ids (1..total_rows) que caen en la ventana LastUpdatedTime de la query
+        first_id, last_id = server.window_ids(query)
+
+        if 'COUNT(*)' in query.upper():
+            self._send_json(200, {'QueryResponse': {'totalCount': last_id - first_id + 1}})
+            return
+
+        start_match = _START_RE.search(query)
+        max_match = _MAX_RE.search(query)
+        start = int(start_match.group(1)) if start_match else 1
+        max_results = int(max_match.group(1)) if max_match else server.total_rows
+        end = min(first_id - 1 + start - 1 + max_results, last_id)
+        rows = [make_entity(entity, i) for i in range(first_id + start - 1, end + 1)]
+        self._send_json(200, {'QueryResponse': {entity: rows, 'startPosition': start}})
+
+    def do_POST(self):
+        # endpoint OAuth: emite un access token nuevo y rota el refresh token
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        params = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if params.get('refresh_token', [''])[0] != server.refresh_token:
+            self._send_json(400, {'error': 'invalid_grant'})
+            return
+        with server._count_lock:
+            server.token_count += 1
+            access_token = f'stub-access-{server.token_count}'
+            server.refresh_token = f'stub-refresh-{server.token_count}'
+            server.access_tokens.add(access_token)
+        self._send_json(200, {
+            'access_token': access_token,
+            'expires_in': server.token_expires_in,
+            'refresh_token': server.refresh_token,
+            'x_refresh_token_expires_in': 8726400,
+        })
+
+    def _send_cdc(self, params):
+        # cada registro cambiado tiene su propio LastUpdatedTime (1 s de
+        # diferencia) y, como QBO, se devuelven máx. 1000 por entidad
+        server = self.server
+        entities = params.get('entities', [''])[0].split(',')
+        changed_since = _parse_qb_time(params['changedSince'][0])
+        first_id = max(1, server.total_rows - server.cdc_rows + 1)
+        query_responses = []
+        for entity in entities:
+            rows = []
+            for i in range(first_id, server.total_rows + 1):
+                updated_at = server.cdc_base_time + timedelta(seconds=i - first_id)
+                if updated_at < changed_since:
+                    continue
+                row = make_deleted_entity(i) if i % 10 == 0 else make_entity(entity, i)
+                row['MetaData'] = {**row['MetaData'], 'LastUpdatedTime': updated_at.isoformat()}
+                rows.append(row)
+                if len(rows) == CDC_MAX_RESULTS:
+                    break
+            query_responses.append({entity: rows, 'startPosition': 1, 'maxResults': len(rows)})
+        self._send_json(200, {
+            'CDCResponse': [{'QueryResponse': query_responses}],
+            'time': datetime.now(timezone.utc).isoformat(),
+        })
+
+
+class QBStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, total_rows=1000, latency=0.0, error_rate=0.0, port=0, cdc_rows=100,
+                 timeline=None, require_auth=False, token_expires_in=3600):
+        super().__init__(('127.0.0.1', port), QBStubHandler)
+        # require_auth: solo acepta access tokens emitidos por POST /oauth2/v1/tokens/bearer
+        self.access_tokens = set() if require_auth else None
+        self.refresh_token = 'stub-refresh-0'
+        self.token_expires_in = token_expires_in
+        self.token_count = 0
+        # timeline: LastUpdatedTime (datetime, ordenado) de cada fila; sin él
+        # las queries ignoran el filtro de fechas y ven todas las filas
+        self.timeline = timeline
+        self.total_rows = len(timeline) if timeline is not None else total_rows
+        self.cdc_rows = cdc_rows
+        # los cambios de /cdc ocurren en el último día, dentro de los 30 que guarda QBO
+        self.cdc_base_time = datetime.now(timezone.utc) - timedelta(days=1)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.request_count = 0
+        self.connection_count = 0
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def window_ids(self, query):
+        if self.timeline is None:
+            return 1, self.total_rows
+        since_match = _SINCE_RE.search(query)
+        until_match = _UNTIL_RE.search(query)
+        first = bisect_left(self.timeline, _parse_qb_time(since_match.group(1))) if since_match else 0
+        last = bisect_left(self.timeline, _parse_qb_time(until_match.group(1))) if until_match else len(self.timeline)
+        return first + 1, last
+
+    @property
+    def token_url(self):
+        return f'{self.base_url}/oauth2/v1/tokens/bearer'
+
+    def revoke_tokens(self):
+        # simula la expiración de todos los access tokens emitidos
+        with self._count_lock:
+            self.access_tokens.clear()
+
+    def record_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def process_request(self, request, client_address):
+        # cada conexión TCP aceptada pasa por aquí una sola vez
+        with self._count_lock:
+            self.connection_count += 1
+        super().process_request(request, client_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,13 @@
+#Exportamos las tablas raw de todas las entidades a postgres
+
+if 'data_exporter' not in globals():
+    from mage_ai.data_preparation.decorators import data_exporter
+
+from scheduler.utils.qb_export import export_raw_tables
+
+
+# merge en raw_qb_* y guardado de checkpoints en utils/qb_export,
+# compartido con los exporters de invoices y customers
+@data_exporter
+def export_data(data, *args, **kwargs):
+    return export_raw_tables(data, kwargs)
@@ -0,0 +1,32 @@
+# librerías
+from mage_ai.data_preparation.shared.secrets import get_secret_value
+from scheduler.utils.qb_extractor import extract_entities, resolve_entities
+
+
+if 'data_loader' not in globals():
+    from mage_ai.data_preparation.decorators import data_loader
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
+
+
+# varias entidades de QBO en una sola corrida: mismo access token, mismo pool
+# HTTP y mismo presupuesto de requests del realm. Trigger var entities: lista
+# o "Invoice,Customer,Item,Payment,Bill" (ver QB_ENTITIES en utils/qb_extractor)
+@data_loader
+def load_data(*args, **kwargs):
+    realm_id = get_secret_value('qb_realm_id')
+    entities = resolve_entities(kwargs.get('entities'))
+    return extract_entities(entities, realm_id, **kwargs)
+
+
+@test
+def test_output(output, *args) -> None:
+    assert output is not None, 'El output está vacío'
+
+    if '_processing_log' in output:
+        assert len(output['_processing_log']) > 0, 'No hay logs de procesamiento'
+        print(f"Chunks procesados: {len(output['_processing_log'])}")
+
+    for entity, records in output.get("QueryResponse", {}).items():
+        if isinstance(records, list):
+            print(f"Total {entity} extraídos: {len(records)}")
@@ -1,8 +1,13 @@
 import io
+import os
+import tempfile
+
 import pandas as pd
 import requests
 from pandas import DataFrame
 
+from scheduler.utils.http_cache import cached_download
+
 if 'data_loader' not in globals():
     from mage_ai.data_preparation.decorators import data_loader
 if 'test' not in globals():
@@ -16,7 +21,11 @@ def load_data_from_api(**kwargs) -> DataFrame:
     """
     url = 'https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv?raw=True'
 
-    return pd.read_csv(url)
+    # cache local: solo se vuelve a descargar si el archivo cambió (ETag).
+    # Se lee desde un hard link propio: el blob del cache lo puede evictar otro proceso
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = cached_download(url, os.path.join(tmp_dir, 'titanic.csv'), kwargs.get('http_cache_dir'))
+        return pd.read_csv(path)
 
 
 @test
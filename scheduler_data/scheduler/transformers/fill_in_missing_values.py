@@ -1,5 +1,18 @@
+import os
+
 from pandas import DataFrame
-import math
+
+from scheduler.utils.median_imputer import (
+    DEFAULT_MODEL_DIR,
+    DEFAULT_PRECISION,
+    column_medians,
+    fill_with_medians,
+    grouped_medians,
+    load_imputer,
+)
+
+# modelo de medianas persistido entre corridas (utils/median_imputer.load_imputer)
+DEFAULT_IMPUTER_PATH = os.path.join(DEFAULT_MODEL_DIR, 'titanic_medians.json')
 
 if 'transformer' not in globals():
     from mage_ai.data_preparation.decorators import transformer
@@ -10,12 +23,13 @@ def select_number_columns(df: DataFrame) -> DataFrame:
     return df[['Age', 'Fare', 'Parch', 'Pclass', 'SibSp', 'Survived']]
 
 
-def fill_missing_values_with_median(df: DataFrame) -> DataFrame:
-    for col in df.columns:
-        values = sorted(df[col].dropna().tolist())
-        median_value = values[math.floor(len(values) / 2)]
-        df[[col]] = df[[col]].fillna(median_value)
-    return df
+def fill_missing_values_with_median(df: DataFrame, group_by=None) -> DataFrame:
+    # todas las medianas en una pasada y fillna en el lugar; con group_by
+    # (p. ej. 'Pclass') la mediana de cada grupo, y la global si el grupo no tiene
+    medians = column_medians(df)
+    if group_by:
+        return fill_with_medians(df, grouped_medians(df, group_by), group_by, fallback=medians)
+    return fill_with_medians(df, medians)
 
 
 @transformer
@@ -33,8 +47,28 @@ def transform_df(df: DataFrame, *args, **kwargs) -> DataFrame:
         DataFrame: Transformed data frame
     """
     # Specify your transformation logic here
+    # trigger vars opcionales:
+    # - impute_group_by: columna o lista (p. ej. 'Pclass') para medianas por grupo
+    # - impute_mode: exact (por defecto: medianas exactas de este batch, sin
+    #   modelo) o, opt-in, con el modelo guardado: apply (sus medianas; se
+    #   ajusta una vez si no existe), update (suma este batch al modelo) o
+    #   refit (lo recalcula con este batch)
+    # - imputer_path / impute_precision: archivo del modelo y decimales de los
+    #   conteos (más decimales = medianas más exactas y modelo más grande)
+    group_by = kwargs.get('impute_group_by')
+    mode = kwargs.get('impute_mode', 'exact')
+    df = select_number_columns(df)
 
-    return fill_missing_values_with_median(select_number_columns(df))
+    if mode == 'exact':
+        return fill_missing_values_with_median(df, group_by)
+    model = load_imputer(
+        kwargs.get('imputer_path', DEFAULT_IMPUTER_PATH),
+        df,
+        mode=mode,
+        group_by=group_by,
+        precision=int(kwargs.get('impute_precision', DEFAULT_PRECISION)),
+    )
+    return model.fill(df)
 
 
 @test
@@ -0,0 +1,26 @@
+#Aplanamos los payload de raw_qb_invoice en tablas tipadas (invoices, invoice_lines)
+
+if 'transformer' not in globals():
+    from mage_ai.data_preparation.decorators import transformer
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
+
+from scheduler.utils.pg_bulk import get_engine
+from scheduler.utils.qb_flatten import DEFAULT_FLATTEN_BATCH_SIZE, flatten_raw_invoices
+from scheduler.utils.trigger_vars import flag
+
+
+@transformer
+def transform(data, *args, **kwargs):
+    # lee la tabla raw (no el output del exporter): solo las filas todavía no
+    # aplanadas, en batches; flatten_full_refresh=true la recorre entera
+    batch_size = int(kwargs.get("flatten_batch_size", DEFAULT_FLATTEN_BATCH_SIZE))
+    full_refresh = flag(kwargs, "flatten_full_refresh")
+    return flatten_raw_invoices(get_engine(), batch_size, full_refresh)
+
+
+@test
+def test_output(output, *args) -> None:
+    assert output is not None, "El output está vacío"
+    assert "invoice_lines" in output, "No se encontró el conteo de invoice_lines en el output"
+    print(f"Invoices aplanadas: {output['invoices']}, líneas: {output['invoice_lines']}")
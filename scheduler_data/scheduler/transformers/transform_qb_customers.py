@@ -3,9 +3,7 @@ if 'transformer' not in globals():
 if 'test' not in globals():
     from mage_ai.data_preparation.decorators import test
 
-import pandas as pd
-import json
-from datetime import datetime
+from scheduler.utils.qb_raw import build_raw_frame, join_chunk_windows
 
 @transformer
 def transform(data, *args, **kwargs):
@@ -16,33 +14,20 @@ def transform(data, *args, **kwargs):
     query_response = data.get("QueryResponse", {})
     customers = query_response.get("Customer", [])
 
-    # Metadata global
-    ingested_at_utc = datetime.utcnow().isoformat()
-    extract_window_start_utc = kwargs.get("extract_window_start_utc", ingested_at_utc)
-    extract_window_end_utc = kwargs.get("extract_window_end_utc", ingested_at_utc)
-    page_number = kwargs.get("page_number", 1)
-    page_size = kwargs.get("page_size", len(customers))
-    request_payload = kwargs.get("request_payload", {})
-
-    rows = []
-    for cust in customers:
-        rows.append({
-            "id": cust.get("Id"),
-            "payload": json.dumps(cust),  # JSON completo de la entidad
-            "ingested_at_utc": ingested_at_utc,
-            "extract_window_start_utc": extract_window_start_utc,
-            "extract_window_end_utc": extract_window_end_utc,
-            "page_number": page_number,
-            "page_size": page_size,
-            "request_payload": json.dumps(request_payload),
-        })
-
-    df_customers = pd.DataFrame(rows)
+    # frame por columnas (utils/qb_raw): id/payload por entidad y los valores
+    # del batch difundidos (en modo streaming cada batch trae su ventana y página)
+    df_customers = build_raw_frame(customers, data.get("_batch_metadata", {}), kwargs)
+
+    # ventana de cada fila desde la tabla de chunks del loader (una entrada por chunk)
+    df_customers = join_chunk_windows(df_customers, data.get("_chunks"), "Customer")
 
     print(f"Transformados {len(df_customers)} customers en formato raw staging")
 
     return {
-        "qb_customer": df_customers
+        "qb_customer": df_customers,
+        # checkpoints / high-water marks del loader; el exporter los guarda después del merge
+        "_checkpoints": data.get("_checkpoints", []),
+        "_cdc_state": data.get("_cdc_state")
     }
 
 
@@ -0,0 +1,26 @@
+#Transformamos los datos crudos de cada entidad en su tabla raw
+
+if 'transformer' not in globals():
+    from mage_ai.data_preparation.decorators import transformer
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
+
+from scheduler.utils.qb_raw import transform_entities
+
+
+@transformer
+def transform(data, *args, **kwargs):
+    # una tabla qb_<entidad> por cada entidad del QueryResponse
+    output = transform_entities(data, kwargs)
+    for table_name, df in output.items():
+        if not table_name.startswith("_"):
+            print(f"Transformadas {len(df)} filas de {table_name} en formato raw staging")
+    return output
+
+
+@test
+def test_output(output, *args) -> None:
+    assert output is not None, "El output está vacío"
+    for table_name, df in output.items():
+        if not table_name.startswith("_"):
+            print(f"Shape {table_name}:", df.shape)
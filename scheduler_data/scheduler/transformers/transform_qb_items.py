@@ -4,9 +4,7 @@ if 'transformer' not in globals():
 if 'test' not in globals():
     from mage_ai.data_preparation.decorators import test
 
-import pandas as pd
-from datetime import datetime, timezone
-import json
+from scheduler.utils.qb_raw import build_raw_frame, join_chunk_windows
 
 @transformer
 def transform(data, *args, **kwargs):
@@ -19,35 +17,24 @@ def transform(data, *args, **kwargs):
 
     print(f"Número de items encontrados: {len(items)}")
 
+    # checkpoints / high-water marks del loader; el exporter los guarda después del merge
+    checkpoints = data.get("_checkpoints", [])
+    cdc_state = data.get("_cdc_state")
+
     if not items:
         print("No hay items para procesar")
-        return {"qb_item": pd.DataFrame()}
-
-    # Extraer metadatos 
-    extract_window_start_utc = kwargs.get("extract_window_start_utc", datetime.now(timezone.utc).isoformat())
-    extract_window_end_utc = kwargs.get("extract_window_end_utc", datetime.now(timezone.utc).isoformat())
-    page_number = kwargs.get("page_number", 1)
-    page_size = kwargs.get("page_size", len(items))
-    request_payload = kwargs.get("request_payload", {})
-
-    df_items = pd.DataFrame([
-        {
-            #variables determinadas en el pdf de deber
-            "id": item.get("Id"),
-            "payload": json.dumps(item, default=str),
-            "ingested_at_utc": datetime.now(timezone.utc).isoformat(),
-            "extract_window_start_utc": extract_window_start_utc,
-            "extract_window_end_utc": extract_window_end_utc,
-            "page_number": page_number,
-            "page_size": page_size,
-            "request_payload": json.dumps(request_payload, default=str),
-        }
-        for item in items
-    ])
+
+    # frame por columnas (utils/qb_raw): id/payload por entidad y los valores
+    # del batch difundidos, con un solo timestamp por batch (sin items queda
+    # vacío pero con las columnas raw)
+    df_items = build_raw_frame(items, data.get("_batch_metadata", {}), kwargs)
+
+    # ventana de cada fila desde la tabla de chunks del loader (una entrada por chunk)
+    df_items = join_chunk_windows(df_items, data.get("_chunks"), "Item")
 
     print(f"Items transformados: {len(df_items)} filas, {len(df_items.columns)} columnas")
 
-    return {"qb_item": df_items}
+    return {"qb_item": df_items, "_checkpoints": checkpoints, "_cdc_state": cdc_state}
 
 
 @test
@@ -0,0 +1,286 @@
+# Cache local de descargas HTTP para archivos fuente (CSV de TLC, titanic).
+# Cada URL apunta a un blob guardado por su sha256 (objects/<sha256>), así
+# dos URLs con el mismo contenido comparten archivo. El índice (url ->
+# ETag, Last-Modified, blob, tamaño, último uso) es un JSON protegido con
+# flock, igual que qb_auth/qb_rate_limit, porque ingest_data descarga desde
+# varios procesos a la vez.
+#
+# - Revalidación: con el archivo en cache se pide con If-None-Match /
+#   If-Modified-Since; un 304 no descarga nada.
+# - Reanudación: la descarga va a partial/<url>.part; si se corta, la
+#   siguiente sigue con Range + If-Range (si el archivo cambió en el
+#   servidor, responde 200 y se empieza de cero). Un 416 (el .part ya
+#   estaba completo) termina la descarga si el tamaño coincide con el del
+#   servidor, si no descarta el .part.
+# - Tamaño: al agregar un blob se borran los de uso más antiguo (LRU) hasta
+#   quedar bajo max_bytes.
+#
+# Sin dependencias del resto de scheduler: ingest_data.py lo importa fuera de Mage.
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import requests
+
+DEFAULT_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'http_cache')
+DEFAULT_MAX_BYTES = 5 * 2**30
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+DEFAULT_TIMEOUT = 60
+
+
+def _url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _content_range_total(value):
+    # "bytes */1234" (416) o "bytes 0-99/1234" -> 1234; None si no se sabe
+    try:
+        total = value.rsplit('/', 1)[1]
+        return None if total == '*' else int(total)
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _link_or_copy(path, dest):
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(path, dest)
+    except OSError:
+        shutil.copyfile(path, dest)
+
+
+@contextmanager
+def _locked_file(path):
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class HttpCache:
+    """
+    Cache de descargas en cache_dir, acotado a max_bytes. Process-safe:
+    un flock por URL (dos procesos no bajan el mismo archivo) y otro para
+    el índice.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, timeout=DEFAULT_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        for sub_dir in ('objects', 'partial', 'locks'):
+            os.makedirs(os.path.join(cache_dir, sub_dir), exist_ok=True)
+        self.index_path = os.path.join(cache_dir, 'index.json')
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.cache_dir, 'objects', sha256)
+
+    @contextmanager
+    def _locked_index(self):
+        with _locked_file(f'{self.index_path}.lock'):
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+            except (FileNotFoundError, ValueError):
+                index = {}
+            yield index
+            tmp_path = f'{self.index_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def _cached_entry(self, key):
+        with self._locked_index() as index:
+            entry = index.get(key)
+            if entry and not os.path.exists(self._blob_path(entry['sha256'])):
+                # blob borrado a mano o por otro proceso
+                del index[key]
+                entry = None
+            return entry
+
+    def _touch(self, key, dest=None):
+        """
+        Marca la entrada como usada y, con dest, enlaza el blob bajo el lock
+        del índice (así no lo borra el _evict de otro proceso en el medio).
+        False si la entrada ya no está (la evictó otro proceso tras el 304).
+        """
+        with self._locked_index() as index:
+            entry = index.get(key)
+            if entry is None or not os.path.exists(self._blob_path(entry['sha256'])):
+                index.pop(key, None)
+                return False
+            entry['last_used'] = time.time()
+            if dest is not None:
+                _link_or_copy(self._blob_path(entry['sha256']), dest)
+            return True
+
+    def _download(self, url, key, entry, dest=None):
+        """
+        GET condicional y/o reanudado. Devuelve el sha256 del contenido, o
+        None si el servidor respondió 304 (la copia en cache sigue vigente).
+        """
+        part_path = os.path.join(self.cache_dir, 'partial', f'{key}.part')
+        part_meta_path = f'{part_path}.json'
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        part_meta = {}
+        if offset:
+            try:
+                with open(part_meta_path) as f:
+                    part_meta = json.load(f)
+            except (FileNotFoundError, ValueError):
+                part_meta = {}
+            if part_meta.get('validator'):
+                headers['Range'] = f'bytes={offset}-'
+                headers['If-Range'] = part_meta['validator']
+
+        with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                return None
+            if response.status_code == 416 and 'Range' in headers:
+                # el .part ya tiene el cuerpo completo (p. ej. se cortó antes de
+                # moverlo a objects/): se termina si el tamaño coincide, si no
+                # se descarta y se descarga de cero
+                if _content_range_total(response.headers.get('Content-Range')) == offset:
+                    return self._finish_download(url, key, part_path, part_meta, dest)
+                print(f"Descarga parcial de {url} inválida (416), se descarga de nuevo")
+                self._discard_partial(part_path)
+                return self._download(url, key, entry, dest)
+            response.raise_for_status()
+
+            resumed = response.status_code == 206
+            if resumed:
+                print(f"Reanudando descarga de {url} desde {offset / 2**20:.1f} MiB")
+            # un ETag fuerte (o Last-Modified) permite reanudar si se corta
+            etag = response.headers.get('ETag')
+            new_validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+            part_meta = {
+                'validator': new_validator,
+                'etag': etag,
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            with open(part_meta_path, 'w') as f:
+                json.dump(part_meta, f)
+
+            with open(part_path, 'ab' if resumed else 'wb') as f:
+                for block in response.iter_content(chunk_size=DOWNLOAD_BLOCK_SIZE):
+                    f.write(block)
+
+        return self._finish_download(url, key, part_path, part_meta, dest)
+
+    def _discard_partial(self, part_path):
+        for path in (part_path, f'{part_path}.json'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _finish_download(self, url, key, part_path, part_meta, dest=None):
+        # .part completo -> objects/<sha256>, entrada en el índice y dest
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(DOWNLOAD_BLOCK_SIZE), b''):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        blob_path = self._blob_path(sha256)
+        if os.path.exists(blob_path):
+            os.remove(part_path)
+        else:
+            os.replace(part_path, blob_path)
+        self._discard_partial(part_path)
+
+        with self._locked_index() as index:
+            if dest is not None:
+                # antes de _evict y bajo el lock: el blob no puede desaparecer en el medio
+                _link_or_copy(blob_path, dest)
+            index[key] = {
+                'url': url,
+                'sha256': sha256,
+                'size': os.path.getsize(blob_path),
+                'etag': part_meta.get('etag'),
+                'last_modified': part_meta.get('last_modified'),
+                'last_used': time.time(),
+            }
+            self._evict(index, keep=key)
+        return sha256
+
+    def _evict(self, index, keep):
+        """
+        Borra entradas de uso más antiguo hasta que los blobs ocupen menos de
+        max_bytes (nunca la recién usada). Un blob compartido por varias URLs
+        se borra cuando ya no lo referencia ninguna.
+        """
+        sizes = {entry['sha256']: entry['size'] for entry in index.values()}
+        total = sum(sizes.values())
+        for key in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            sha256 = index.pop(key)['sha256']
+            if all(entry['sha256'] != sha256 for entry in index.values()):
+                try:
+                    os.remove(self._blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+                total -= sizes[sha256]
+                print(f"Cache HTTP: eliminado {sha256[:12]} ({sizes[sha256] / 2**20:.1f} MiB) por tamaño")
+
+    def fetch(self, url, dest=None):
+        """
+        Contenido de url: la copia en cache si el servidor confirma que no
+        cambió (304), si no la descarga (o la termina de descargar). Sin
+        conexión usa la copia en cache si existe.
+
+        Con dest el blob se enlaza (o copia) a dest antes de soltar los locks
+        y se devuelve dest. Sin dest se devuelve la ruta del blob, que otro
+        proceso puede evictar en cualquier momento: para leer el archivo hay
+        que pasar dest.
+        """
+        key = _url_key(url)
+        with _locked_file(os.path.join(self.cache_dir, 'locks', f'{key}.lock')):
+            entry = self._cached_entry(key)
+            start_time = time.time()
+            try:
+                sha256 = self._download(url, key, entry, dest)
+            except requests.exceptions.ConnectionError:
+                if entry is None:
+                    raise
+                print(f"Sin conexión para revalidar {url}, usando la copia en cache")
+                sha256 = None
+
+            if sha256 is None:
+                if self._touch(key, dest):
+                    print(f"Cache HTTP vigente para {url}")
+                    return dest or self._blob_path(entry['sha256'])
+                # evictado por otro proceso entre el 304 y el enlace: se baja de nuevo
+                print(f"Cache HTTP de {url} evictado, se descarga de nuevo")
+                sha256 = self._download(url, key, None, dest)
+            size = os.path.getsize(dest or self._blob_path(sha256))
+            print(f"Descargado {url}: {size / 2**20:.1f} MiB en {time.time() - start_time:.2f}s")
+            return dest or self._blob_path(sha256)
+
+
+def cached_download(url, dest=None, cache_dir=None, max_bytes=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Descarga url a través del cache y devuelve la ruta local. Con dest el
+    archivo queda en dest (hard link si se puede, si no copia) y sobrevive a
+    la evicción del blob; sin dest se devuelve la ruta del blob (ver
+    HttpCache.fetch).
+    """
+    cache = HttpCache(cache_dir or DEFAULT_CACHE_DIR, max_bytes or DEFAULT_MAX_BYTES, timeout)
+    return cache.fetch(url, dest)
@@ -0,0 +1,255 @@
+# Imputación de nulos con la mediana, vectorizada:
+# - column_medians: todas las columnas en una sola pasada (np.nanmedian).
+# - grouped_medians: mediana por grupo (p. ej. por Pclass) con groupby.
+# - StreamingMedian: mediana aproximada para entradas por chunks (CSV con
+#   chunksize, batches de un generador). Guarda conteos de valores
+#   redondeados a `precision` decimales, que se suman chunk a chunk; la
+#   memoria depende de los valores distintos, no de las filas. Es exacta
+#   para columnas discretas (Pclass, SibSp, Parch) y con error de a lo sumo
+#   10**-precision para las continuas (Age, Fare).
+# fill_with_medians completa df en el lugar con cualquiera de los tres.
+#
+# Los conteos de StreamingMedian sirven además de modelo persistido
+# (load_imputer): se calculan una vez, se guardan como JSON chico y cada
+# corrida los aplica o les suma solo las filas nuevas, sin releer historia.
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PRECISION = 2
+IMPUTER_MODES = ('apply', 'update', 'refit')
+DEFAULT_MODEL_DIR = os.environ.get('IMPUTER_MODEL_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifacts'
+)
+MODEL_VERSION = 2
+
+
+def column_medians(df):
+    """
+    Mediana de cada columna ignorando nulos (la mediana real: promedio de
+    los dos del medio si la cantidad es par). Columnas todo nulas -> NaN.
+    """
+    values = df.to_numpy(dtype='float64', na_value=np.nan)
+    with warnings.catch_warnings():
+        # "All-NaN slice encountered" para columnas sin ningún valor
+        warnings.simplefilter('ignore', RuntimeWarning)
+        medians = np.nanmedian(values, axis=0)
+    return pd.Series(medians, index=df.columns)
+
+
+def grouped_medians(df, group_by):
+    """
+    Mediana de cada columna (menos las de group_by) por grupo: un DataFrame
+    indexado por las claves del grupo.
+    """
+    group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+    columns = [column for column in df.columns if column not in group_by]
+    return df.groupby(group_by, sort=False)[columns].median()
+
+
+def fill_with_medians(df, medians, group_by=None, fallback=None):
+    """
+    Completa los nulos de df en el lugar y lo devuelve. medians es una
+    Series (columna -> mediana) o, con group_by, un DataFrame por grupo; las
+    filas de grupos sin mediana (o con la clave nula) usan fallback.
+    """
+    if group_by is not None:
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        null_columns = [column for column in medians.columns if df[column].hasnans]
+        if null_columns:
+            # una fila de medianas por fila de df, según su grupo
+            if len(group_by) == 1:
+                keys = pd.Index(df[group_by[0]])
+            else:
+                keys = pd.MultiIndex.from_frame(df[group_by])
+            row_medians = medians[null_columns].reindex(keys).set_axis(df.index)
+            df.fillna(row_medians, inplace=True)
+        medians = fallback
+    if medians is not None:
+        null_columns = {column: value for column, value in medians.items()
+                        if column in df.columns and df[column].hasnans}
+        if null_columns:
+            df.fillna(null_columns, inplace=True)
+    return df
+
+
+def _median_from_counts(counts):
+    # counts: Series valor -> cantidad, ordenada por valor
+    cumulative = counts.to_numpy().cumsum()
+    total = cumulative[-1] if len(cumulative) else 0
+    if total == 0:
+        return np.nan
+    values = counts.index.to_numpy(dtype='float64')
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2 + 1)]
+    upper = values[np.searchsorted(cumulative, total // 2 + 1)]
+    return (lower + upper) / 2
+
+
+class StreamingMedian:
+    """
+    Mediana aproximada acumulada chunk a chunk (ver el comentario del
+    módulo). update() suma los conteos de un chunk; medians() y
+    fill() se pueden llamar en cualquier momento.
+    """
+
+    def __init__(self, columns=None, group_by=None, precision=DEFAULT_PRECISION):
+        self.columns = list(columns) if columns is not None else None
+        self.group_by = [group_by] if isinstance(group_by, str) else (list(group_by) if group_by else [])
+        self.precision = precision
+        self.counts = {}
+        # con group_by: conteos de todas las filas (también las de clave nula)
+        # por columna, incluidas las de group_by, para el fallback global
+        self.global_counts = {}
+        self.rows = 0
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.columns = [column for column in chunk.columns if column not in self.group_by]
+        keys = [chunk[column] for column in self.group_by]
+        for column in self.columns:
+            values = chunk[column].astype('float64').round(self.precision)
+            # conteos por (grupo..., valor); los nulos no cuentan
+            new_counts = values.groupby(keys + [values], dropna=True).size() if keys else values.value_counts()
+            previous = self.counts.get(column)
+            self.counts[column] = new_counts if previous is None else previous.add(new_counts, fill_value=0)
+        if keys:
+            for column in self.columns + self.group_by:
+                new_counts = chunk[column].astype('float64').round(self.precision).value_counts()
+                previous = self.global_counts.get(column)
+                self.global_counts[column] = new_counts if previous is None else previous.add(new_counts, fill_value=0)
+        self.rows += len(chunk)
+        return self
+
+    def _column_median(self, column):
+        counts = self.counts[column]
+        if not self.group_by:
+            return _median_from_counts(counts.sort_index())
+        levels = list(range(len(self.group_by)))
+        return (
+            counts.sort_index()
+            .groupby(level=levels, sort=False)
+            .apply(lambda group: _median_from_counts(group.droplevel(levels)))
+        )
+
+    def medians(self):
+        """
+        Series columna -> mediana, o con group_by un DataFrame por grupo.
+        """
+        if not self.group_by:
+            return pd.Series({column: self._column_median(column) for column in self.columns}, dtype='float64')
+        return pd.DataFrame({column: self._column_median(column) for column in self.columns})
+
+    def global_medians(self):
+        # medianas sin separar por grupo, también de las columnas de group_by:
+        # fallback para grupos sin datos y filas con la clave nula (igual que
+        # column_medians en el camino exacto)
+        if not self.group_by:
+            return self.medians()
+        return pd.Series({
+            column: _median_from_counts(counts.sort_index())
+            for column, counts in self.global_counts.items()
+        }, dtype='float64')
+
+    def fill(self, df):
+        return fill_with_medians(
+            df, self.medians(), self.group_by or None, self.global_medians() if self.group_by else None
+        )
+
+    def to_dict(self):
+        # conteos como filas [grupo..., valor, cantidad] (JSON sin índices de pandas)
+        return {
+            'version': MODEL_VERSION,
+            'columns': self.columns,
+            'group_by': self.group_by,
+            'precision': self.precision,
+            'rows': self.rows,
+            'counts': {
+                column: [[*key, int(count)] if isinstance(key, tuple) else [key, int(count)]
+                         for key, count in counts.items()]
+                for column, counts in self.counts.items()
+            },
+            'global_counts': {
+                column: [[value, int(count)] for value, count in counts.items()]
+                for column, counts in self.global_counts.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != MODEL_VERSION:
+            raise ValueError(f"Versión de modelo de imputación no soportada: {data.get('version')}")
+        streaming = cls(data['columns'], data['group_by'], data['precision'])
+        streaming.rows = data['rows']
+        levels = streaming.group_by + ['value']
+        for column, rows in data['counts'].items():
+            counts = pd.DataFrame(rows, columns=levels + ['count']).set_index(levels)['count']
+            streaming.counts[column] = counts.rename_axis(streaming.group_by + [column])
+        for column, rows in data['global_counts'].items():
+            counts = pd.DataFrame(rows, columns=['value', 'count']).set_index('value')['count']
+            streaming.global_counts[column] = counts.rename_axis(column)
+        return streaming
+
+    def save(self, path):
+        # escritura atómica: otra corrida nunca lee un JSON a medias
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+
+def streaming_medians(chunks, columns=None, group_by=None, precision=DEFAULT_PRECISION):
+    """
+    Recorre chunks (iterable de DataFrames) y devuelve el StreamingMedian
+    con sus conteos.
+    """
+    streaming = StreamingMedian(columns, group_by, precision)
+    for chunk in chunks:
+        streaming.update(chunk)
+    return streaming
+
+
+def load_imputer(path, df, mode='apply', group_by=None, precision=DEFAULT_PRECISION):
+    """
+    Modelo de medianas para df guardado en path:
+    - apply: usa el modelo guardado tal cual (lo ajusta con df si no existe);
+    - update: le suma los conteos de df (las filas nuevas) y lo guarda;
+    - refit: lo recalcula solo con df y lo guarda.
+    Si el modelo guardado es de otro group_by/precision o de otras columnas se recalcula.
+    """
+    if mode not in IMPUTER_MODES:
+        raise ValueError(f"impute_mode desconocido: {mode} (usar {', '.join(IMPUTER_MODES)})")
+    group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+    columns = [column for column in df.columns if column not in group_by]
+
+    try:
+        model = None if mode == 'refit' else StreamingMedian.load(path)
+    except ValueError as e:
+        print(f"{e}, se recalcula")
+        model = None
+    if model is not None and (model.group_by, model.precision, model.columns) != (group_by, precision, columns):
+        print(f"El modelo de {path} no coincide (group_by/precision/columnas), se recalcula")
+        model = None
+
+    if model is None:
+        model = StreamingMedian(columns, group_by, precision).update(df)
+        print(f"Modelo de medianas ajustado con {len(df)} filas")
+    elif mode == 'update':
+        model.update(df)
+        print(f"Modelo de medianas actualizado con {len(df)} filas nuevas ({model.rows} en total)")
+    else:
+        print(f"Modelo de medianas de {path} ({model.rows} filas)")
+        return model
+    model.save(path)
+    return model
@@ -0,0 +1,226 @@
+# Motor de extracción asíncrono (asyncio + httpx) para los backfills de QBO.
+# Mantiene hasta max_in_flight requests en vuelo entre todos los chunks con
+# un solo AsyncClient (pool keep-alive); los reintentos, el rate limiter y
+# los 429 esperan con asyncio.sleep, así una página lenta no frena al resto.
+# Lo usan los loaders con el trigger engine: async (engine: sync es el default).
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+
+from scheduler.utils.qb_auth import refresh_access_token, resolve_access_token
+from scheduler.utils.qb_client import (
+    AUTH_STATUS_CODES,
+    DEFAULT_TIMEOUT,
+    MAX_RETRIES,
+    QBO_MAX_CONCURRENT_REQUESTS,
+    RETRY_STATUS_CODES,
+)
+from scheduler.utils.qb_pages import (
+    DEFAULT_PAGE_SIZE,
+    count_query,
+    merge_pages,
+    page_offsets,
+    window_query,
+)
+from scheduler.utils.qb_rate_limit import get_rate_limiter, parse_retry_after
+
+DEFAULT_MAX_IN_FLIGHT = 8
+ENGINES = ('sync', 'async')
+
+
+def resolve_engine(value):
+    engine = (value or 'sync').lower()
+    if engine not in ENGINES:
+        raise ValueError(f"engine debe ser uno de {ENGINES}, no {value!r}")
+    return engine
+
+
+def resolve_max_in_flight(value):
+    # QBO no admite más de 10 requests simultáneos por realm
+    return max(1, min(int(value or DEFAULT_MAX_IN_FLIGHT), QBO_MAX_CONCURRENT_REQUESTS))
+
+
+def build_async_client(max_in_flight=DEFAULT_MAX_IN_FLIGHT, timeout=DEFAULT_TIMEOUT):
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+        timeout=timeout,
+        headers={'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'},
+    )
+
+
+async def _acquire_rate_limit(rate_limiter):
+    # el TokenBucket lee y escribe su archivo bajo flock (bloqueante): va en
+    # un hilo para no frenar a las demás corrutinas; la espera, con asyncio.sleep
+    while True:
+        wait = await asyncio.to_thread(rate_limiter.try_acquire)
+        if not wait:
+            return
+        await asyncio.sleep(wait)
+
+
+async def fetch_qb_data_async(client, semaphore, realm_id, access_token, query, base_url, minor_version):
+    """
+    Versión asíncrona de qb_client.fetch_qb_data: mismos reintentos (429 con
+    Retry-After, 5xx con backoff exponencial, 401 con token nuevo), sin
+    bloquear el event loop.
+    """
+    url = f"{base_url.rstrip('/')}/v3/company/{realm_id}/query"
+    params = {'query': query, 'minorversion': minor_version}
+    rate_limiter = get_rate_limiter(realm_id)
+
+    for i in range(MAX_RETRIES):
+        try:
+            await _acquire_rate_limit(rate_limiter)
+            access_token = await asyncio.to_thread(resolve_access_token, access_token)
+            headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'text/plain'}
+            async with semaphore:
+                response = await client.get(url, headers=headers, params=params)
+
+            if response.status_code == 200:
+                return response.json()
+
+            elif response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                wait = retry_after if retry_after is not None else 2 ** i
+                print(f"Error 429, esperando {wait:.1f}s ({i+1}/{MAX_RETRIES})...")
+                await asyncio.to_thread(rate_limiter.block_for, wait)
+                continue
+
+            elif response.status_code == 401:
+                refreshed = await asyncio.to_thread(refresh_access_token, access_token)
+                if refreshed is None:
+                    response.raise_for_status()
+                access_token = refreshed
+                continue
+
+            elif response.status_code in RETRY_STATUS_CODES:
+                print(f"Error {response.status_code}, reintentando ({i+1}/{MAX_RETRIES})...")
+                await asyncio.sleep(2 ** i)
+                continue
+            else:
+                response.raise_for_status()
+
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in AUTH_STATUS_CODES:
+                raise
+            print(f"Error en la pull de la API: {e}")
+            await asyncio.sleep(2 ** i)
+
+    raise Exception(f"Request falló después de {MAX_RETRIES} reintentos")
+
+
+async def _fetch_pages_async(fetch, entity, chunk_start, chunk_end, start_position, page_size):
+    # páginas en serie: cada STARTPOSITION se pide al volver la página anterior
+    batches = []
+    while True:
+        data = await fetch(window_query(entity, chunk_start, chunk_end, start_position, page_size))
+        batch = data.get("QueryResponse", {}).get(entity, [])
+        if not batch:
+            break
+        batches.append(batch)
+        if len(batch) < page_size:
+            break
+        start_position += page_size
+    return batches
+
+
+async def _fetch_pages_fanout_async(fetch, entity, chunk_start, chunk_end, start_position, page_size):
+    # COUNT(*) y todas las páginas a la vez (ver utils/qb_pages.fetch_pages_fanout)
+    data = await fetch(count_query(entity, chunk_start, chunk_end))
+    offsets = page_offsets(data.get("QueryResponse", {}).get("totalCount", 0), page_size, start_position)
+    pages = await asyncio.gather(*[
+        fetch(window_query(entity, chunk_start, chunk_end, offset, page_size)) for offset in offsets
+    ])
+    batches = [page.get("QueryResponse", {}).get(entity, []) for page in pages]
+    while batches and len(batches[-1]) == page_size:
+        offsets.append(offsets[-1] + page_size)
+        page = await fetch(window_query(entity, chunk_start, chunk_end, offsets[-1], page_size))
+        batches.append(page.get("QueryResponse", {}).get(entity, []))
+    return [batch for _, _, batch, _ in merge_pages(offsets, batches, page_size)]
+
+
+async def _process_chunk_async(client, semaphore, realm_id, access_token, base_url, minor_version,
+                               entity, chunk, page_fanout=False, page_size=DEFAULT_PAGE_SIZE):
+    # misma salida que _process_chunk de los loaders: (entidades, log_entry)
+    chunk_number = chunk['chunk_number']
+    chunk_start_str = chunk['chunk_start']
+    chunk_end_str = chunk['chunk_end']
+    start_position = chunk.get('start_position', 1)
+
+    def fetch(query):
+        return fetch_qb_data_async(client, semaphore, realm_id, access_token, query, base_url, minor_version)
+
+    chunk_start_time = time.time()
+    try:
+        fetch_pages = _fetch_pages_fanout_async if page_fanout else _fetch_pages_async
+        batches = await fetch_pages(fetch, entity, chunk_start_str, chunk_end_str, start_position, page_size)
+        records = [record for batch in batches for record in batch]
+        pages_read = len(batches)
+
+        chunk_duration = time.time() - chunk_start_time
+        print(f"Chunk {chunk_number} completado: {len(records)} {entity} en {chunk_duration:.2f}s")
+        return records, {
+            "chunk_number": chunk_number,
+            "fecha_inicio_chunk": chunk_start_str,
+            "fecha_fin_chunk": chunk_end_str,
+            "paginas_leidas": pages_read,
+            "filas_procesadas": len(records),
+            "duracion_segundos": round(chunk_duration, 2),
+            "status": "success",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    except Exception as e:
+        print(f"Error en chunk {chunk_number}: {str(e)}")
+        return [], {
+            "chunk_number": chunk_number,
+            "fecha_inicio_chunk": chunk_start_str,
+            "fecha_fin_chunk": chunk_end_str,
+            "paginas_leidas": 0,
+            "filas_procesadas": 0,
+            "duracion_segundos": round(time.time() - chunk_start_time, 2),
+            "status": "error",
+            "error_message": str(e),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+
+async def _run_chunks_async(realm_id, access_token, base_url, minor_version, entity, chunks,
+                            max_in_flight, page_fanout):
+    semaphore = asyncio.Semaphore(max_in_flight)
+    async with build_async_client(max_in_flight) as client:
+        # gather conserva el orden de chunks, igual que run_chunks
+        return await asyncio.gather(*[
+            _process_chunk_async(
+                client, semaphore, realm_id, access_token, base_url, minor_version,
+                entity, chunk, page_fanout
+            )
+            for chunk in chunks
+        ])
+
+
+def _run_coroutine(coroutine):
+    # en el kernel de Mage puede haber un event loop corriendo en este hilo
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def run_chunks_async(realm_id, access_token, base_url, minor_version, entity, chunks,
+                     max_in_flight=DEFAULT_MAX_IN_FLIGHT, page_fanout=False):
+    """
+    Procesa todos los chunks con el motor asíncrono y devuelve
+    [(entidades, log_entry)] en el orden de chunks (como run_chunks). Con
+    page_fanout las páginas de cada chunk también se piden en paralelo.
+    """
+    max_in_flight = resolve_max_in_flight(max_in_flight)
+    print(f"Motor async: hasta {max_in_flight} requests en vuelo")
+    return _run_coroutine(_run_chunks_async(
+        realm_id, access_token, base_url, minor_version, entity, chunks, max_in_flight, page_fanout
+    ))
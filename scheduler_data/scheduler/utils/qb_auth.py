@@ -0,0 +1,207 @@
+# Access token de QBO compartido por los tres loaders.
+# El token (y el refresh token rotado) se guarda con su expiración en un
+# archivo JSON protegido con flock, igual que el rate limiter: los pipelines
+# que corren a la vez reutilizan el mismo access token y solo uno refresca.
+# Se refresca unos minutos antes de expirar o cuando QBO responde 401.
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+OAUTH_TOKEN_URL = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
+REFRESH_TOKEN_SECRET = 'qb_refresh_token'
+# copia del refresh token rotado mientras se reemplaza REFRESH_TOKEN_SECRET
+PENDING_REFRESH_TOKEN_SECRET = 'qb_refresh_token_pending'
+# refrescar cuando al access token (1 hora) le quedan menos de 5 minutos
+REFRESH_MARGIN_SECONDS = 300
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), 'qb_oauth')
+
+_managers = {}
+_managers_lock = threading.Lock()
+# access token emitido -> TokenManager que lo emitió (para refrescar tras un 401)
+_token_owners = {}
+
+
+def _save_refresh_token_secret(refresh_token):
+    # Intuit rota el refresh token y el anterior ya no sirve: el nuevo se
+    # escribe primero en un secret aparte y recién después se reemplaza el
+    # principal, así nunca queda solo en memoria (y ya está en el archivo
+    # de estado, que TokenManager escribe antes de llamar a esta función)
+    from mage_ai.data_preparation.shared.secrets import create_secret, delete_secret
+
+    def replace_secret(name):
+        try:
+            delete_secret(name)
+        except Exception:
+            pass  # todavía no existía
+        create_secret(name, refresh_token)
+
+    try:
+        replace_secret(PENDING_REFRESH_TOKEN_SECRET)
+        replace_secret(REFRESH_TOKEN_SECRET)
+        delete_secret(PENDING_REFRESH_TOKEN_SECRET)
+    except Exception as e:
+        print(f"No se pudo guardar el refresh token rotado en los secrets de Mage: {e}")
+        raise
+    print("Refresh token rotado guardado en los secrets de Mage")
+
+
+class TokenManager:
+    """
+    Cachea el access token con su expires_in. Thread-safe (lock) y
+    process-safe (flock sobre el archivo de estado); el POST de refresh se
+    hace con el archivo bloqueado para que nunca refresquen dos a la vez.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_token,
+                 state_dir=DEFAULT_STATE_DIR, token_url=OAUTH_TOKEN_URL,
+                 save_refresh_token=_save_refresh_token_secret):
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', str(client_id))
+        os.makedirs(state_dir, mode=0o700, exist_ok=True)
+        self.path = os.path.join(state_dir, f'{safe_key}.json')
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.token_url = token_url
+        self.save_refresh_token = save_refresh_token
+        self.refresh_count = 0
+        # refresh token rotado que falta guardar en los secrets
+        self._unsaved_refresh_token = None
+        self._cached = (None, 0)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        # el archivo guarda tokens: solo lectura/escritura para el dueño
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._lock, os.fdopen(fd, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _post_refresh(self, refresh_token):
+        return requests.post(
+            self.token_url,
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/x-www-form-urlencoded"
+            },
+            data={"grant_type": "refresh_token", "refresh_token": refresh_token},
+            auth=(self.client_id, self.client_secret),
+            timeout=30
+        )
+
+    def _refresh(self, state):
+        # el refresh token más nuevo es el del archivo; si lo rechazan se
+        # prueba con el del secret (p. ej. alguien re-autorizó la app)
+        refresh_token = state.get('refresh_token') or self.refresh_token
+        response = self._post_refresh(refresh_token)
+        if response.status_code in (400, 401) and refresh_token != self.refresh_token:
+            response = self._post_refresh(self.refresh_token)
+        response.raise_for_status()
+        token_data = response.json()
+
+        now = time.time()
+        state['access_token'] = token_data['access_token']
+        state['expires_at'] = now + int(token_data.get('expires_in', 3600))
+        new_refresh_token = token_data.get('refresh_token', refresh_token)
+        if new_refresh_token != state.get('refresh_token', self.refresh_token):
+            # se guarda en los secrets al salir de _locked_state, ya escrito el archivo
+            self._unsaved_refresh_token = new_refresh_token
+        state['refresh_token'] = new_refresh_token
+        self.refresh_count += 1
+        print(f"Access token de QBO refrescado (expira en {int(state['expires_at'] - now)}s)")
+
+    def _register(self, state):
+        _token_owners[state['access_token']] = self
+        self._cached = (state['access_token'], state['expires_at'])
+        return state['access_token']
+
+    def get_token(self, min_valid_seconds=REFRESH_MARGIN_SECONDS):
+        """Access token vigente por al menos min_valid_seconds (refresca si no)."""
+        # camino rápido sin tocar el archivo: un token sigue siendo válido
+        # hasta su expiración aunque otro proceso ya haya refrescado
+        access_token, expires_at = self._cached
+        if access_token and expires_at - time.time() >= min_valid_seconds:
+            return access_token
+
+        with self._locked_state() as state:
+            if not state.get('access_token') or state['expires_at'] - time.time() < min_valid_seconds:
+                self._refresh(state)
+            access_token = self._register(state)
+        self._save_rotated_refresh_token()
+        return access_token
+
+    def invalidate(self, stale_token):
+        """Tras un 401: refresca, salvo que otro hilo/proceso ya lo haya hecho."""
+        with self._locked_state() as state:
+            if state.get('access_token') in (None, stale_token):
+                self._refresh(state)
+            access_token = self._register(state)
+        self._save_rotated_refresh_token()
+        return access_token
+
+    def _save_rotated_refresh_token(self):
+        # después de escribir el archivo de estado: si guardar el secret falla,
+        # el token vigente sigue en el archivo y la excepción se propaga
+        with self._lock:
+            refresh_token, self._unsaved_refresh_token = self._unsaved_refresh_token, None
+        if refresh_token:
+            self.save_refresh_token(refresh_token)
+
+
+def get_token_manager():
+    from mage_ai.data_preparation.shared.secrets import get_secret_value
+
+    def pending_refresh_token():
+        try:
+            return get_secret_value(PENDING_REFRESH_TOKEN_SECRET)
+        except Exception:
+            return None
+
+    client_id = get_secret_value('qb_client_id')
+    with _managers_lock:
+        manager = _managers.get(client_id)
+        if manager is None:
+            manager = TokenManager(
+                client_id,
+                get_secret_value('qb_client_secret'),
+                # si un guardado se cortó a mitad, el rotado quedó en el pendiente
+                pending_refresh_token() or get_secret_value(REFRESH_TOKEN_SECRET)
+            )
+            _managers[client_id] = manager
+        return manager
+
+
+def get_access_token():
+    """Access token de QBO, reutilizando el cacheado mientras no esté por expirar."""
+    return get_token_manager().get_token()
+
+
+def resolve_access_token(access_token):
+    """
+    Antes de cada request: si el token lo emitió un TokenManager, devuelve
+    el vigente (refrescado si está por expirar); si no, lo deja igual.
+    """
+    manager = _token_owners.get(access_token)
+    return manager.get_token() if manager else access_token
+
+
+def refresh_access_token(stale_token):
+    """Tras un 401 devuelve un token nuevo, o None si el token no es administrado."""
+    manager = _token_owners.get(stale_token)
+    return manager.invalidate(stale_token) if manager else None
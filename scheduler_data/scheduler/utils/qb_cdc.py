@@ -0,0 +1,181 @@
+# Modo incremental con el endpoint ChangeDataCapture (/cdc) de QBO.
+# Guarda un high-water mark por (realm, entidad) en qb_cdc_state y pide solo
+# lo que cambió desde ahí (incluye registros borrados, con status "Deleted").
+from datetime import datetime, timedelta, timezone
+
+from scheduler.utils.qb_chunks import parse_iso_datetime
+from scheduler.utils.qb_client import fetch_qb_cdc
+
+# QBO solo guarda 30 días de cambios y devuelve máx. 1000 objetos por entidad
+CDC_MAX_LOOKBACK_DAYS = 30
+CDC_MAX_RESULTS = 1000
+
+CDC_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS qb_cdc_state (
+    realm_id text NOT NULL,
+    entity text NOT NULL,
+    high_water_mark text NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (realm_id, entity)
+)
+"""
+
+
+def load_high_water_marks(engine, realm_id, entities):
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CDC_STATE_DDL)
+            cursor.execute(
+                "SELECT entity, high_water_mark FROM qb_cdc_state "
+                "WHERE realm_id = %s AND entity = ANY(%s)",
+                (realm_id, list(entities))
+            )
+            rows = cursor.fetchall()
+        connection.commit()
+    finally:
+        connection.close()
+    return dict(rows)
+
+
+def save_cdc_state(engine, cdc_state):
+    """Guarda los high-water marks de _cdc_state (lo llama el exporter tras el merge)."""
+    if not cdc_state:
+        return
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CDC_STATE_DDL)
+            for entity, high_water_mark in cdc_state['high_water_marks'].items():
+                cursor.execute(
+                    """
+                    INSERT INTO qb_cdc_state (realm_id, entity, high_water_mark, updated_at)
+                    VALUES (%s, %s, %s, now())
+                    ON CONFLICT (realm_id, entity) DO UPDATE SET
+                        high_water_mark = EXCLUDED.high_water_mark,
+                        updated_at = now()
+                    """,
+                    (cdc_state['realm_id'], entity, high_water_mark)
+                )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def _parse_cdc_datetime(value):
+    # cdc_since puede venir sin zona ('2026-10-10'): se toma como UTC
+    parsed = parse_iso_datetime(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def resolve_changed_since(high_water_marks, entities, default_since=None):
+    """
+    changedSince común para el request: el high-water mark más antiguo de
+    las entidades pedidas (o default_since si alguna no tiene uno todavía).
+    Fechas sin zona horaria se interpretan en UTC.
+    """
+    missing = [entity for entity in entities if entity not in high_water_marks]
+    if missing and not default_since:
+        raise ValueError(
+            f"No hay high-water mark CDC para {', '.join(missing)}; pasar cdc_since "
+            f"(dentro de los últimos {CDC_MAX_LOOKBACK_DAYS} días) en la primera corrida CDC. "
+            f"El backfill no guarda high-water marks: cdc_since tiene que cubrir desde "
+            f"donde terminó el backfill"
+        )
+
+    candidates = [high_water_marks[entity] for entity in entities if entity in high_water_marks]
+    if missing:
+        candidates.append(_parse_cdc_datetime(default_since).isoformat())
+    changed_since = min(candidates, key=_parse_cdc_datetime)
+
+    oldest_allowed = datetime.now(timezone.utc) - timedelta(days=CDC_MAX_LOOKBACK_DAYS)
+    if _parse_cdc_datetime(changed_since) < oldest_allowed:
+        raise ValueError(
+            f"changedSince {changed_since} supera los {CDC_MAX_LOOKBACK_DAYS} días que "
+            f"guarda QBO; usar el backfill con fecha_inicio/fecha_fin para ese rango"
+        )
+    return changed_since
+
+
+def parse_cdc_response(data, entities):
+    changes = {entity: [] for entity in entities}
+    for cdc_response in data.get('CDCResponse', []):
+        for query_response in cdc_response.get('QueryResponse', []):
+            for entity in entities:
+                changes[entity].extend(query_response.get(entity, []))
+    return changes
+
+
+def fetch_cdc_changes(realm_id, access_token, base_url, minor_version, entities, changed_since):
+    """
+    Devuelve ({entidad: registros}, server_time). Si una entidad llega al
+    tope de 1000 objetos se vuelve a pedir solo esa entidad desde el último
+    LastUpdatedTime recibido (el merge por id descarta los repetidos).
+    """
+    changes = {entity: [] for entity in entities}
+    server_time = None
+    pending = list(entities)
+    since = changed_since
+
+    while pending:
+        data = fetch_qb_cdc(realm_id, access_token, pending, since, base_url, minor_version)
+        # el primer request marca hasta dónde quedó cubierto el rango
+        server_time = server_time or data.get('time')
+        batch = parse_cdc_response(data, pending)
+        for entity, records in batch.items():
+            changes[entity].extend(records)
+
+        pending = [entity for entity, records in batch.items() if len(records) >= CDC_MAX_RESULTS]
+        if pending:
+            next_since = max(
+                (
+                    record.get('MetaData', {}).get('LastUpdatedTime', since)
+                    for entity in pending for record in batch[entity]
+                ),
+                key=_parse_cdc_datetime
+            )
+            if next_since == since:
+                raise Exception(
+                    f"Más de {CDC_MAX_RESULTS} cambios con LastUpdatedTime {since}; "
+                    f"usar el backfill para ese rango"
+                )
+            print(f"CDC con más de {CDC_MAX_RESULTS} cambios en {pending}, continuando desde {next_since}")
+            since = next_since
+
+    return changes, server_time or datetime.now(timezone.utc).isoformat()
+
+
+def extract_cdc(realm_id, access_token, base_url, minor_version, entities, engine, default_since=None):
+    """
+    Arma el output del loader en modo CDC, con la misma forma que el backfill
+    ({"QueryResponse": {entidad: [...]}}) más _cdc_state para el exporter.
+    """
+    high_water_marks = load_high_water_marks(engine, realm_id, entities)
+    changed_since = resolve_changed_since(high_water_marks, entities, default_since)
+    print(f"CDC de {', '.join(entities)} desde {changed_since}")
+
+    changes, server_time = fetch_cdc_changes(
+        realm_id, access_token, base_url, minor_version, entities, changed_since
+    )
+    for entity, records in changes.items():
+        deleted = len([record for record in records if record.get('status') == 'Deleted'])
+        print(f" - {entity}: {len(records)} cambios ({deleted} borrados)")
+
+    return {
+        "QueryResponse": changes,
+        "_cdc_state": {
+            "realm_id": realm_id,
+            "high_water_marks": {entity: server_time for entity in entities}
+        },
+        "_extraction_metadata": {
+            'extraction_type': 'cdc',
+            'entities': list(entities),
+            'changed_since': changed_since,
+            'server_time': server_time,
+            'extracted_at': datetime.utcnow().isoformat()
+        }
+    }
@@ -0,0 +1,139 @@
+# Checkpoints de backfill en Postgres (tabla qb_backfill_state).
+# Una fila por (pipeline, entidad, ventana del chunk) con su estado y el
+# siguiente STARTPOSITION a pedir, para retomar un backfill interrumpido.
+#
+# El loader solo lee el estado y registra errores; los chunks/páginas se
+# marcan como cargados desde el exporter, después del merge en raw_qb_*,
+# así un chunk nunca queda "done" sin estar realmente en el warehouse.
+
+STATE_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS qb_backfill_state (
+    pipeline_uuid text NOT NULL,
+    entity text NOT NULL,
+    chunk_start text NOT NULL,
+    chunk_end text NOT NULL,
+    status text NOT NULL,
+    last_start_position integer NOT NULL DEFAULT 1,
+    rows_loaded bigint NOT NULL DEFAULT 0,
+    error_message text,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (pipeline_uuid, entity, chunk_start, chunk_end)
+)
+"""
+
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_DONE = 'done'
+STATUS_ERROR = 'error'
+
+
+def ensure_state_table(cursor):
+    cursor.execute(STATE_TABLE_DDL)
+
+
+def load_chunk_states(engine, pipeline_uuid, entity):
+    """Devuelve {(chunk_start, chunk_end): estado} para la entidad."""
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            ensure_state_table(cursor)
+            cursor.execute(
+                "SELECT chunk_start, chunk_end, status, last_start_position, rows_loaded "
+                "FROM qb_backfill_state WHERE pipeline_uuid = %s AND entity = %s",
+                (pipeline_uuid, entity)
+            )
+            rows = cursor.fetchall()
+        connection.commit()
+    finally:
+        connection.close()
+
+    return {
+        (chunk_start, chunk_end): {
+            'status': status,
+            'last_start_position': last_start_position,
+            'rows_loaded': rows_loaded,
+        }
+        for chunk_start, chunk_end, status, last_start_position, rows_loaded in rows
+    }
+
+
+def save_checkpoints(engine, pipeline_uuid, checkpoints):
+    """
+    Upsert de una lista de checkpoints:
+    {entity, chunk_start, chunk_end, status, last_start_position, rows, error_message}.
+    rows se suma a rows_loaded (una página a la vez en modo streaming).
+    """
+    if not checkpoints:
+        return
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            ensure_state_table(cursor)
+            for checkpoint in checkpoints:
+                cursor.execute(
+                    """
+                    INSERT INTO qb_backfill_state (
+                        pipeline_uuid, entity, chunk_start, chunk_end, status,
+                        last_start_position, rows_loaded, error_message, updated_at
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now())
+                    ON CONFLICT (pipeline_uuid, entity, chunk_start, chunk_end) DO UPDATE SET
+                        status = EXCLUDED.status,
+                        last_start_position = EXCLUDED.last_start_position,
+                        rows_loaded = qb_backfill_state.rows_loaded + EXCLUDED.rows_loaded,
+                        error_message = EXCLUDED.error_message,
+                        updated_at = now()
+                    """,
+                    (
+                        pipeline_uuid,
+                        checkpoint['entity'],
+                        checkpoint['chunk_start'],
+                        checkpoint['chunk_end'],
+                        checkpoint['status'],
+                        checkpoint.get('last_start_position', 1),
+                        checkpoint.get('rows', 0),
+                        checkpoint.get('error_message'),
+                    )
+                )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def plan_resume(chunks, states, retry_failed_only=False):
+    """
+    Cruza los chunks planificados con el estado guardado. Devuelve
+    (chunks_a_procesar, chunks_omitidos); cada chunk a procesar trae
+    'start_position' (1, o la página donde quedó si estaba en progreso o
+    falló: las páginas anteriores ya están en raw_qb_* y en rows_loaded).
+    """
+    pending = []
+    skipped = []
+    for chunk in chunks:
+        state = states.get((chunk['chunk_start'], chunk['chunk_end']))
+        status = state['status'] if state else None
+
+        if status == STATUS_DONE or (retry_failed_only and status != STATUS_ERROR):
+            skipped.append(chunk)
+            continue
+
+        start_position = 1
+        if status in (STATUS_IN_PROGRESS, STATUS_ERROR):
+            start_position = state['last_start_position']
+        pending.append({**chunk, 'start_position': start_position})
+    return pending, skipped
+
+
+def chunk_checkpoint(entity, chunk, status, last_start_position=1, rows=0, error_message=None):
+    return {
+        'entity': entity,
+        'chunk_start': chunk['chunk_start'],
+        'chunk_end': chunk['chunk_end'],
+        'status': status,
+        'last_start_position': last_start_position,
+        'rows': rows,
+        'error_message': error_message,
+    }
@@ -0,0 +1,217 @@
+# Segmentación del rango de backfill en chunks de fechas (fijos o de tamaño
+# adaptativo) y ejecución (secuencial o con concurrencia acotada) de esos chunks.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from scheduler.utils.qb_checkpoint import plan_resume
+from scheduler.utils.qb_client import QBO_MAX_CONCURRENT_REQUESTS
+
+QB_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S-00:00'
+
+
+def parse_iso_datetime(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def build_chunks(fecha_inicio, fecha_fin, chunk_days=7):
+    """
+    Divide [fecha_inicio, fecha_fin) en ventanas de chunk_days días,
+    numeradas desde 1 en orden cronológico.
+    """
+    start_dt = parse_iso_datetime(fecha_inicio)
+    end_dt = parse_iso_datetime(fecha_fin)
+
+    chunks = []
+    current_date = start_dt
+    chunk_number = 1
+    while current_date < end_dt:
+        chunk_end = min(current_date + timedelta(days=chunk_days), end_dt)
+        chunks.append({
+            'chunk_number': chunk_number,
+            'chunk_start': current_date.strftime(QB_DATETIME_FORMAT),
+            'chunk_end': chunk_end.strftime(QB_DATETIME_FORMAT),
+            'start_position': 1,
+        })
+        current_date = chunk_end
+        chunk_number += 1
+    return chunks
+
+
+def resolve_max_parallel_chunks(value):
+    # nunca más chunks en vuelo que requests concurrentes permite QBO por realm
+    max_parallel_chunks = int(value or 1)
+    return max(1, min(max_parallel_chunks, QBO_MAX_CONCURRENT_REQUESTS))
+
+
+def run_chunks(chunks, process_chunk, max_parallel_chunks=1):
+    """
+    Ejecuta process_chunk(chunk) para cada chunk y devuelve los resultados
+    en el mismo orden que chunks, sin importar el orden en que terminen.
+    El ritmo de requests lo marca el rate limiter de qb_client, no hay
+    pausas fijas entre chunks.
+    """
+    max_parallel_chunks = resolve_max_parallel_chunks(max_parallel_chunks)
+
+    if max_parallel_chunks == 1:
+        return [process_chunk(chunk) for chunk in chunks]
+
+    print(f"Procesando chunks en paralelo (max_parallel_chunks={max_parallel_chunks})")
+    with ThreadPoolExecutor(max_workers=max_parallel_chunks) as executor:
+        # map conserva el orden de entrada -> _processing_log determinista
+        return list(executor.map(process_chunk, chunks))
+
+
+def chunk_table_entry(entity, chunk, row_start, row_count, processed_at):
+    """
+    Fila de la tabla de chunks (_chunks) del loader: la ventana del chunk se
+    guarda una vez y las entidades la referencian por su rango de filas
+    [row_start, row_start + row_count) en QueryResponse[entity].
+    """
+    return {
+        'entity': entity,
+        'chunk_number': chunk['chunk_number'],
+        'chunk_start': chunk['chunk_start'],
+        'chunk_end': chunk['chunk_end'],
+        'processed_at': processed_at,
+        'row_start': row_start,
+        'row_count': row_count,
+    }
+
+
+# --- segmentación adaptativa ---------------------------------------------
+
+DEFAULT_TARGET_ROWS_PER_CHUNK = 5000
+# bastante por debajo del timeout de 60s de cada request
+DEFAULT_MAX_PAGE_SECONDS = 20
+DEFAULT_MIN_CHUNK_DAYS = 1 / 24
+DEFAULT_MAX_CHUNK_DAYS = 92
+# cuánto puede crecer o achicarse la ventana de una tanda a la siguiente
+MAX_RESIZE_FACTOR = 4
+
+
+def adaptive_chunk_options(kwargs):
+    """Lee del trigger los parámetros de run_adaptive_chunks."""
+    return {
+        'target_rows': int(kwargs.get('target_rows_per_chunk', DEFAULT_TARGET_ROWS_PER_CHUNK)),
+        'max_page_seconds': float(kwargs.get('max_page_seconds', DEFAULT_MAX_PAGE_SECONDS)),
+        'min_days': float(kwargs.get('min_chunk_days', DEFAULT_MIN_CHUNK_DAYS)),
+        'max_days': float(kwargs.get('max_chunk_days', DEFAULT_MAX_CHUNK_DAYS)),
+    }
+
+
+def next_chunk_days(chunk_days, observations, target_rows=DEFAULT_TARGET_ROWS_PER_CHUNK,
+                    max_page_seconds=DEFAULT_MAX_PAGE_SECONDS,
+                    min_days=DEFAULT_MIN_CHUNK_DAYS, max_days=DEFAULT_MAX_CHUNK_DAYS):
+    """
+    Tamaño (en días) de la próxima ventana según lo observado en la tanda
+    anterior: observations es una lista de (dias, filas, paginas, duracion,
+    ok). Apunta a target_rows filas por chunk (menos requests casi vacíos)
+    y usa a lo sumo la mitad de la ventana anterior si hubo errores o
+    páginas lentas. Solo cambia las ventanas siguientes: los chunks ya
+    pedidos no se vuelven a partir.
+    """
+    succeeded = [obs for obs in observations if obs[4]]
+    days = sum(obs[0] for obs in succeeded)
+    rows = sum(obs[1] for obs in succeeded)
+
+    if rows:
+        proposed = target_rows * days / rows
+    else:
+        proposed = chunk_days * MAX_RESIZE_FACTOR
+    proposed = min(max(proposed, chunk_days / MAX_RESIZE_FACTOR), chunk_days * MAX_RESIZE_FACTOR)
+
+    slow = any(pages and duration / pages > max_page_seconds for _, _, pages, duration, _ in succeeded)
+    if slow or len(succeeded) < len(observations):
+        proposed = min(proposed, chunk_days / 2)
+    return min(max(proposed, min_days), max_days)
+
+
+def _known_windows(states, start_dt, end_dt):
+    # ventanas de qb_backfill_state dentro del rango, ordenadas por inicio
+    windows = []
+    for chunk_start, chunk_end in states:
+        window_start = parse_iso_datetime(chunk_start)
+        window_end = parse_iso_datetime(chunk_end)
+        if start_dt <= window_start and window_end <= end_dt:
+            windows.append((window_start, window_end, chunk_start, chunk_end))
+    return sorted(windows)
+
+
+def run_adaptive_chunks(fecha_inicio, fecha_fin, process_chunk, chunk_days=7, states=None,
+                        retry_failed_only=False, max_parallel_chunks=1, run_wave=None, **options):
+    """
+    Recorre [fecha_inicio, fecha_fin) con ventanas de tamaño variable: cada
+    tanda de max_parallel_chunks ventanas se procesa con run_chunks y sus
+    filas/páginas/duración (del log de process_chunk) deciden el tamaño de
+    la siguiente (run_wave(chunks) reemplaza a run_chunks, p. ej. con el motor
+    async). Un chunk que pasa target_rows o tiene páginas lentas se carga
+    igual entero, y uno con error queda como error en qb_backfill_state (se
+    reintenta con la misma ventana, p. ej. con retry_failed_only); solo las
+    ventanas siguientes se achican. Las ventanas ya guardadas en
+    qb_backfill_state se respetan tal cual para que los checkpoints sigan calzando.
+    Devuelve (chunks, resultados, omitidos).
+    """
+    states = states or {}
+    start_dt = parse_iso_datetime(fecha_inicio)
+    end_dt = parse_iso_datetime(fecha_fin)
+    known = _known_windows(states, start_dt, end_dt)
+    chunk_days = float(chunk_days)
+
+    chunks, results, skipped = [], [], []
+    cursor = start_dt
+    chunk_number = 1
+    while cursor < end_dt:
+        wave = []
+        while cursor < end_dt and len(wave) < resolve_max_parallel_chunks(max_parallel_chunks):
+            reused = next((window for window in known if window[0] == cursor), None)
+            if reused:
+                window_end, chunk_start, chunk_end = reused[1], reused[2], reused[3]
+            else:
+                window_end = min(cursor + timedelta(days=chunk_days), end_dt)
+                # sin pisar una ventana guardada que empiece más adelante
+                window_end = min([window_end] + [w[0] for w in known if cursor < w[0] < window_end])
+                if retry_failed_only:
+                    # solo se reintentan ventanas con error: el hueco se omite entero
+                    window_end = min([end_dt] + [w[0] for w in known if w[0] > cursor])
+                chunk_start = cursor.strftime(QB_DATETIME_FORMAT)
+                chunk_end = window_end.strftime(QB_DATETIME_FORMAT)
+
+            chunk = {
+                'chunk_number': chunk_number,
+                'chunk_start': chunk_start,
+                'chunk_end': chunk_end,
+                'start_position': 1,
+                'chunk_days': (window_end - cursor).total_seconds() / 86400,
+            }
+            pending, omitted = plan_resume([chunk], states, retry_failed_only)
+            wave.extend(pending)
+            skipped.extend(omitted)
+            cursor = window_end
+            chunk_number += 1
+
+        if not wave:
+            continue
+
+        if run_wave:
+            wave_results = run_wave(wave)
+        else:
+            wave_results = run_chunks(wave, process_chunk, max_parallel_chunks)
+        observations = []
+        for chunk, (entities, log_entry) in zip(wave, wave_results):
+            log_entry['dias_chunk'] = round(chunk['chunk_days'], 4)
+            observations.append((
+                chunk['chunk_days'],
+                log_entry['filas_procesadas'],
+                log_entry['paginas_leidas'],
+                log_entry['duracion_segundos'],
+                log_entry['status'] == 'success',
+            ))
+        chunks.extend(wave)
+        results.extend(wave_results)
+
+        new_chunk_days = next_chunk_days(chunk_days, observations, **options)
+        if new_chunk_days != chunk_days:
+            print(f"Ventana ajustada: {chunk_days:.3f} -> {new_chunk_days:.3f} días")
+        chunk_days = new_chunk_days
+
+    return chunks, results, skipped
@@ -0,0 +1,177 @@
+# Cliente HTTP compartido para la API de QuickBooks Online (QBO).
+# Mantiene una sola requests.Session con pool de conexiones keep-alive, asi
+# cada página de un backfill reutiliza la conexión TCP+TLS abierta.
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scheduler.utils.qb_auth import refresh_access_token, resolve_access_token
+from scheduler.utils.qb_rate_limit import get_rate_limiter, parse_retry_after
+
+DEFAULT_BASE_URL = 'https://sandbox-quickbooks.api.intuit.com'
+DEFAULT_MINOR_VERSION = 75
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 60
+
+MAX_RETRIES = 5
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+# credenciales inválidas o sin permiso: reintentar con el mismo token no sirve
+AUTH_STATUS_CODES = [401, 403]
+
+# QBO rechaza con 429 más de 10 requests simultáneos por realm
+QBO_MAX_CONCURRENT_REQUESTS = 10
+
+_session = None
+_session_pool_size = None
+_session_lock = threading.Lock()
+
+_realm_semaphores = {}
+_realm_semaphores_lock = threading.Lock()
+
+
+def build_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Crea una Session con HTTPAdapter de pool_size conexiones por host,
+    keep-alive y respuestas comprimidas (gzip).
+    """
+    session = requests.Session()
+    # los reintentos se controlan en fetch_qb_data, no en urllib3
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def get_session(pool_size=None):
+    """
+    Devuelve la Session del proceso; se crea en el primer uso y se
+    reconstruye solo si se pide un pool_size distinto.
+    """
+    global _session, _session_pool_size
+
+    with _session_lock:
+        if pool_size is None:
+            pool_size = _session_pool_size or DEFAULT_POOL_SIZE
+        if _session is None or pool_size != _session_pool_size:
+            if _session is not None:
+                _session.close()
+            _session = build_session(pool_size)
+            _session_pool_size = pool_size
+        return _session
+
+
+def _realm_semaphore(realm_id):
+    with _realm_semaphores_lock:
+        if realm_id not in _realm_semaphores:
+            _realm_semaphores[realm_id] = threading.BoundedSemaphore(QBO_MAX_CONCURRENT_REQUESTS)
+        return _realm_semaphores[realm_id]
+
+
+def _get_qb_json(realm_id, access_token, endpoint, params, base_url, description,
+                 session=None, timeout=DEFAULT_TIMEOUT):
+    """
+    GET a /v3/company/<realm>/<endpoint> con reintentos, reutilizando la
+    Session compartida. Cada intento consume un token del rate limiter del
+    realm; un 429 pausa a todos los procesos el tiempo de Retry-After y un
+    401 refresca el access token (si lo administra utils/qb_auth). Un 401
+    sin token administrado o un 403 se propagan sin reintentos.
+    """
+    if not base_url or not params.get('minorversion'):
+        raise ValueError("Se requiere una URL base y el minor_version")
+    if not realm_id or not access_token:
+        raise ValueError("Se requiere un realm_id y un access_token")
+
+    session = session or get_session()
+    url = f"{base_url.rstrip('/')}/v3/company/{realm_id}/{endpoint}"
+    rate_limiter = get_rate_limiter(realm_id)
+
+    # Reintentos
+    for i in range(MAX_RETRIES):
+        try:
+            print(f'Request a la API: {url}\n{description}')
+            rate_limiter.acquire()
+            # token vigente: en un backfill largo el de la primera página ya expiró
+            access_token = resolve_access_token(access_token)
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'text/plain'
+            }
+            with _realm_semaphore(realm_id):
+                response = session.get(url, headers=headers, params=params, timeout=timeout)
+
+            if response.status_code == 200:  # éxito
+                data = response.json()
+                print('Datos recibidos de la API correctamente')
+                return data
+
+            elif response.status_code == 429:  # throttling de QBO
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                wait = retry_after if retry_after is not None else 2 ** i
+                print(f"Error 429, esperando {wait:.1f}s ({i+1}/{MAX_RETRIES})...")
+                # el siguiente acquire() espera el bloqueo, en este y en los demás procesos
+                rate_limiter.block_for(wait)
+                continue
+
+            elif response.status_code == 401:  # access token expirado o revocado
+                refreshed = refresh_access_token(access_token)
+                if refreshed is None:
+                    response.raise_for_status()
+                print(f"Error 401, reintentando con un access token nuevo ({i+1}/{MAX_RETRIES})...")
+                access_token = refreshed
+                continue
+
+            elif response.status_code in RETRY_STATUS_CODES:  # errores temporales
+                print(f"Error {response.status_code}, reintentando ({i+1}/{MAX_RETRIES})...")
+                time.sleep(2 ** i)  # backoff exponencial
+                continue
+            else:
+                response.raise_for_status()
+
+        except requests.exceptions.RequestException as e:
+            if e.response is not None and e.response.status_code in AUTH_STATUS_CODES:
+                raise
+            print(f"Error en la pull de la API: {e}")
+            time.sleep(2 ** i)
+
+    raise Exception(f"Request falló después de {MAX_RETRIES} reintentos")
+
+
+def fetch_qb_data(realm_id, access_token, query, base_url, minor_version,
+                  session=None, timeout=DEFAULT_TIMEOUT):
+    """Ejecuta una query de QBO (endpoint /query)."""
+    params = {
+        'query': query,
+        'minorversion': minor_version
+    }
+    return _get_qb_json(
+        realm_id, access_token, 'query', params, base_url,
+        f'Query: {query}', session, timeout
+    )
+
+
+def fetch_qb_cdc(realm_id, access_token, entities, changed_since, base_url, minor_version,
+                 session=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Pide a /cdc los cambios (incluidos borrados) de varias entidades desde
+    changed_since, en un solo request.
+    """
+    params = {
+        'entities': ','.join(entities),
+        'changedSince': changed_since,
+        'minorversion': minor_version
+    }
+    return _get_qb_json(
+        realm_id, access_token, 'cdc', params, base_url,
+        f'CDC: {params["entities"]} desde {changed_since}', session, timeout
+    )
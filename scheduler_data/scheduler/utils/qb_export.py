@@ -0,0 +1,64 @@
+# Exportación común de las tablas raw de QBO a Postgres: cada qb_<entidad>
+# del transformer se mergea por id en raw_qb_<entidad> y después se guardan
+# los checkpoints / high-water marks CDC. La usan export_qb_entities y los
+# exporters de invoices, customers e items.
+import time
+
+import pandas as pd
+
+from scheduler.utils.pg_bulk import DEFAULT_BATCH_SIZE, get_engine, merge_dataframe
+from scheduler.utils.qb_cdc import save_cdc_state
+from scheduler.utils.qb_checkpoint import save_checkpoints
+from scheduler.utils.qb_raw_schema import ensure_raw_schema
+
+
+def export_raw_tables(data, kwargs=None):
+    """
+    {qb_<entidad>: DataFrame, _checkpoints, _cdc_state} -> raw_qb_<entidad>.
+    Devuelve {raw_table: {rows, columns, inserted, updated, skipped, status}}.
+    """
+    kwargs = kwargs or {}
+    engine = get_engine()
+    batch_size = int(kwargs.get("copy_batch_size", DEFAULT_BATCH_SIZE))
+
+    results = {}
+
+    for table_name, df in data.items():
+        if table_name.startswith("_"):  # metadata (checkpoints), no es tabla
+            continue
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            print(f"Tabla {table_name} vacía, se omite exportación")
+            continue
+
+        # qb_<entidad> -> raw_qb_<entidad> (id como llave primaria)
+        raw_table = f"raw_{table_name}"
+        print(f"Exportando {len(df)} filas a tabla {raw_table}...")
+
+        # payload jsonb, columnas generadas e índices (migración idempotente)
+        ensure_raw_schema(engine, raw_table)
+
+        # COPY a staging y merge por id: solo se escriben filas nuevas o con payload distinto
+        start_time = time.time()
+        counts = merge_dataframe(engine, df, raw_table, batch_size=batch_size)
+        duration = time.time() - start_time
+        print(
+            f"Batch {raw_table}: {len(df)} (inserted={counts['inserted']}, "
+            f"updated={counts['updated']}, skipped={counts['skipped']})"
+        )
+        print(f"Carga {raw_table}: {counts['inserted'] + counts['updated']} filas en {duration:.2f}s")
+
+        results[raw_table] = {
+            "rows": len(df),
+            "columns": len(df.columns),
+            **counts,
+            "status": "success"
+        }
+
+    # recién ahora los chunks/páginas (o el high-water mark CDC) quedan como cargados
+    pipeline_uuid = kwargs.get("pipeline_uuid")
+    if pipeline_uuid:
+        save_checkpoints(engine, pipeline_uuid, data.get("_checkpoints", []))
+    save_cdc_state(engine, data.get("_cdc_state"))
+
+    print("Exportación completa")
+    return results
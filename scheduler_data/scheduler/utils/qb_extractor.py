@@ -0,0 +1,463 @@
+# Extractor de QBO parametrizado por entidad. Reemplaza la lógica que estaba
+# copiada en ingest_qb_invoices/customers/items: backfill por chunks (fijo o
+# adaptativo, motor sync o async, con o sin fan-out de páginas), streaming
+# por página, CDC y extracción completa. Varias entidades en una corrida
+# comparten el mismo access token, pool HTTP y presupuesto de requests.
+#
+# Agregar una entidad (Payment, Bill, ...) es una entrada más en QB_ENTITIES.
+import time
+from datetime import datetime
+
+from scheduler.utils.pg_bulk import get_engine
+from scheduler.utils.qb_async import (
+    DEFAULT_MAX_IN_FLIGHT,
+    resolve_engine,
+    resolve_max_in_flight,
+    run_chunks_async,
+)
+from scheduler.utils.qb_auth import get_access_token
+from scheduler.utils.qb_cdc import extract_cdc
+from scheduler.utils.qb_checkpoint import (
+    STATUS_DONE,
+    STATUS_ERROR,
+    STATUS_IN_PROGRESS,
+    chunk_checkpoint,
+    load_chunk_states,
+    plan_resume,
+    save_checkpoints,
+)
+from scheduler.utils.qb_chunks import (
+    adaptive_chunk_options,
+    build_chunks,
+    chunk_table_entry,
+    resolve_max_parallel_chunks,
+    run_adaptive_chunks,
+    run_chunks,
+)
+from scheduler.utils.qb_client import (
+    DEFAULT_BASE_URL,
+    DEFAULT_MINOR_VERSION,
+    DEFAULT_POOL_SIZE,
+    fetch_qb_data,
+    get_session,
+)
+from scheduler.utils.qb_pages import DEFAULT_PAGE_SIZE, fetch_pages_fanout, window_query
+from scheduler.utils.qb_rate_limit import disable_rate_limiter, get_rate_limiter
+from scheduler.utils.trigger_vars import flag
+
+# entidad QBO -> nombre en plural para logs y resumen
+QB_ENTITIES = {
+    'Invoice': 'invoices',
+    'Customer': 'customers',
+    'Item': 'items',
+    'Payment': 'payments',
+    'Bill': 'bills',
+}
+
+
+def resolve_entities(value):
+    """Acepta una lista o un string separado por comas; valida contra QB_ENTITIES."""
+    if isinstance(value, str):
+        value = [entity.strip() for entity in value.split(',') if entity.strip()]
+    entities = list(value or ['Invoice', 'Customer', 'Item'])
+    unknown = [entity for entity in entities if entity not in QB_ENTITIES]
+    if unknown:
+        raise ValueError(f"Entidades QBO no soportadas: {unknown} (ver QB_ENTITIES)")
+    return entities
+
+
+# paginación: genera (page_number, start_position, batch, is_last) página por página
+def iter_entity_pages(realm_id, access_token, base_url, minor_version, entity,
+                      chunk_start_str, chunk_end_str, page_size=DEFAULT_PAGE_SIZE, start_position=1):
+    page_number = (start_position - 1) // page_size + 1
+
+    while True:
+        query = window_query(entity, chunk_start_str, chunk_end_str, start_position, page_size)
+        data = fetch_qb_data(realm_id, access_token, query, base_url, minor_version)
+        batch = data.get("QueryResponse", {}).get(entity, [])
+        if not batch:
+            break
+
+        is_last = len(batch) < page_size  # última página
+        yield page_number, start_position, batch, is_last
+        start_position += page_size
+        page_number += 1
+
+        if is_last:
+            break
+
+
+# procesa un chunk (todas sus páginas) y arma su entrada de log
+def process_chunk(realm_id, access_token, base_url, minor_version, entity, chunk, page_fanout=False):
+    chunk_number = chunk['chunk_number']
+    chunk_start_str = chunk['chunk_start']
+    chunk_end_str = chunk['chunk_end']
+    start_position = chunk.get('start_position', 1)
+
+    print(f"\n--- CHUNK {chunk_number} ({entity}) ---")
+    print(f"Procesando: {chunk_start_str} a {chunk_end_str}")
+    if start_position > 1:
+        print(f"Reanudando desde STARTPOSITION {start_position}")
+
+    chunk_start_time = time.time()
+    try:
+        records = []
+        pages_read = 0
+        if page_fanout:
+            # COUNT(*) de la ventana y todas sus páginas en paralelo
+            pages = fetch_pages_fanout(
+                realm_id, access_token, base_url, minor_version, entity,
+                chunk_start_str, chunk_end_str, start_position=start_position
+            )
+        else:
+            pages = iter_entity_pages(
+                realm_id, access_token, base_url, minor_version, entity,
+                chunk_start_str, chunk_end_str, start_position=start_position
+            )
+        for _, _, batch, _ in pages:
+            records.extend(batch)
+            pages_read += 1
+
+        chunk_duration = time.time() - chunk_start_time
+        log_entry = {
+            "chunk_number": chunk_number,
+            "fecha_inicio_chunk": chunk_start_str,
+            "fecha_fin_chunk": chunk_end_str,
+            "paginas_leidas": pages_read,
+            "filas_procesadas": len(records),
+            "duracion_segundos": round(chunk_duration, 2),
+            "status": "success",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+        print(f"Chunk {chunk_number} completado:")
+        print(f" - {entity}: {len(records)}")
+        print(f" - Duración: {chunk_duration:.2f}s")
+        return records, log_entry
+
+    except Exception as e:
+        error_duration = time.time() - chunk_start_time
+        log_entry = {
+            "chunk_number": chunk_number,
+            "fecha_inicio_chunk": chunk_start_str,
+            "fecha_fin_chunk": chunk_end_str,
+            "paginas_leidas": 0,
+            "filas_procesadas": 0,
+            "duracion_segundos": round(error_duration, 2),
+            "status": "error",
+            "error_message": str(e),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        print(f"Error en chunk {chunk_number}: {str(e)}")
+        return [], log_entry
+
+
+# cruza los chunks del rango con qb_backfill_state (si hay pipeline_uuid)
+def plan_chunks(entity, fecha_inicio, fecha_fin, chunk_days, pipeline_uuid, retry_failed_only):
+    chunks = build_chunks(fecha_inicio, fecha_fin, chunk_days)
+    if not pipeline_uuid:
+        return chunks, []
+
+    states = load_chunk_states(get_engine(), pipeline_uuid, entity)
+    chunks, skipped = plan_resume(chunks, states, retry_failed_only)
+    if skipped:
+        print(f"Reanudando backfill de {entity}: se omiten {len(skipped)} chunks ya cargados")
+    return chunks, skipped
+
+
+# procesa chunks de backfill (max_parallel_chunks > 1 los pide en paralelo;
+# con adaptive_options el tamaño de cada ventana se ajusta sobre la marcha;
+# engine='async' mantiene max_in_flight requests en vuelo con asyncio;
+# page_fanout pide todas las páginas de cada chunk a la vez tras un COUNT)
+def process_backfill_chunks(realm_id, access_token, base_url, minor_version, entity,
+                            fecha_inicio, fecha_fin, chunk_days=7, max_parallel_chunks=1,
+                            pipeline_uuid=None, retry_failed_only=False, adaptive_options=None,
+                            engine='sync', max_in_flight=DEFAULT_MAX_IN_FLIGHT, page_fanout=False):
+    plural = QB_ENTITIES[entity]
+    all_records = []
+    processing_log = []
+
+    print(f"Iniciando backfill de {entity} desde {fecha_inicio} hasta {fecha_fin}")
+
+    backfill_start_time = time.time()
+    run_one = lambda chunk: process_chunk(
+        realm_id, access_token, base_url, minor_version, entity, chunk, page_fanout
+    )
+    if engine == 'async':
+        run_batch = lambda batch: run_chunks_async(
+            realm_id, access_token, base_url, minor_version, entity, batch, max_in_flight, page_fanout
+        )
+    else:
+        run_batch = lambda batch: run_chunks(batch, run_one, max_parallel_chunks)
+
+    if adaptive_options is not None:
+        print(f"Segmentación: adaptativa, desde chunks de {chunk_days} días")
+        states = load_chunk_states(get_engine(), pipeline_uuid, entity) if pipeline_uuid else {}
+        chunks, results, skipped = run_adaptive_chunks(
+            fecha_inicio, fecha_fin, run_one, chunk_days, states,
+            retry_failed_only, max_parallel_chunks, run_batch, **adaptive_options
+        )
+    else:
+        print(f"Segmentación: chunks de {chunk_days} días")
+        chunks, skipped = plan_chunks(
+            entity, fecha_inicio, fecha_fin, chunk_days, pipeline_uuid, retry_failed_only
+        )
+        results = run_batch(chunks)
+
+    # results viene en orden de chunk_number aunque los chunks terminen desordenados
+    checkpoints = []
+    failed = []
+    chunk_table = []
+    for chunk, (records_in_chunk, log_entry) in zip(chunks, results):
+        # metadata del chunk una sola vez, con el rango de filas que le corresponde
+        chunk_table.append(chunk_table_entry(
+            entity, chunk, len(all_records), len(records_in_chunk), log_entry['timestamp']
+        ))
+        all_records.extend(records_in_chunk)
+        processing_log.append(log_entry)
+        if log_entry['status'] == 'success':
+            checkpoints.append(chunk_checkpoint(entity, chunk, STATUS_DONE, rows=len(records_in_chunk)))
+        else:
+            failed.append(chunk_checkpoint(
+                entity, chunk, STATUS_ERROR,
+                last_start_position=chunk['start_position'],
+                error_message=log_entry['error_message']
+            ))
+
+    for chunk in skipped:
+        processing_log.append({
+            "chunk_number": chunk['chunk_number'],
+            "fecha_inicio_chunk": chunk['chunk_start'],
+            "fecha_fin_chunk": chunk['chunk_end'],
+            "paginas_leidas": 0,
+            "filas_procesadas": 0,
+            "duracion_segundos": 0,
+            "status": "skipped",
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    processing_log.sort(key=lambda log: log['chunk_number'])
+
+    # los errores se registran ya; los chunks exitosos los marca el exporter tras el merge
+    if pipeline_uuid:
+        save_checkpoints(get_engine(), pipeline_uuid, failed)
+
+    total_records = len(all_records)
+    successful_chunks = len([log for log in processing_log if log['status'] == 'success'])
+    failed_chunks = len([log for log in processing_log if log['status'] == 'error'])
+    total_duration = sum([log['duracion_segundos'] for log in processing_log])
+    total_pages = sum([log['paginas_leidas'] for log in processing_log])
+    wall_duration = round(time.time() - backfill_start_time, 2)
+
+    print(f"\n=== RESUMEN BACKFILL {entity.upper()} ===")
+    print(f"Total {plural} procesados: {total_records}")
+    print(f"Chunks exitosos: {successful_chunks}")
+    print(f"Chunks fallidos: {failed_chunks}")
+    print(f"Chunks omitidos (ya cargados): {len(skipped)}")
+    print(f"Páginas leídas: {total_pages}")
+    print(f"Duración total: {total_duration:.2f}s (reloj: {wall_duration:.2f}s)")
+
+    return {
+        "QueryResponse": {entity: all_records},
+        "_processing_log": processing_log,
+        "_checkpoints": checkpoints,
+        "_chunks": chunk_table,
+        "_backfill_summary": {
+            f"total_{plural}": total_records,
+            "successful_chunks": successful_chunks,
+            "failed_chunks": failed_chunks,
+            "skipped_chunks": len(skipped),
+            "total_pages": total_pages,
+            "total_duration": total_duration,
+            "wall_duration": wall_duration,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin
+        }
+    }
+
+
+# modo streaming: un batch por página, sin acumular el backfill en memoria
+def stream_backfill_batches(realm_id, access_token, base_url, minor_version, entity,
+                            fecha_inicio, fecha_fin, chunk_days=7,
+                            pipeline_uuid=None, retry_failed_only=False, page_size=DEFAULT_PAGE_SIZE):
+    plural = QB_ENTITIES[entity]
+    print(f"Iniciando backfill streaming de {entity} desde {fecha_inicio} hasta {fecha_fin}")
+
+    chunks, _ = plan_chunks(entity, fecha_inicio, fecha_fin, chunk_days, pipeline_uuid, retry_failed_only)
+    for chunk in chunks:
+        chunk_number = chunk['chunk_number']
+        chunk_start_str = chunk['chunk_start']
+        chunk_end_str = chunk['chunk_end']
+        next_start_position = chunk['start_position']
+        print(f"\n--- CHUNK {chunk_number} ({entity}) ---")
+        print(f"Procesando: {chunk_start_str} a {chunk_end_str}")
+
+        try:
+            chunk_complete = False
+            pages = iter_entity_pages(
+                realm_id, access_token, base_url, minor_version, entity,
+                chunk_start_str, chunk_end_str, page_size, next_start_position
+            )
+            for page_number, start_position, batch, is_last in pages:
+                next_start_position = start_position + page_size
+                chunk_complete = is_last
+                print(f"Chunk {chunk_number}, página {page_number}: {len(batch)} {plural}")
+                yield {
+                    "QueryResponse": {entity: batch},
+                    "_batch_metadata": {
+                        "entity": entity,
+                        "chunk_number": chunk_number,
+                        "chunk_start": chunk_start_str,
+                        "chunk_end": chunk_end_str,
+                        "page_number": page_number,
+                        "start_position": start_position,
+                        "page_size": len(batch),
+                        "processed_at": datetime.utcnow().isoformat()
+                    },
+                    # el exporter guarda la siguiente página a pedir tras el merge
+                    "_checkpoints": [chunk_checkpoint(
+                        entity, chunk, STATUS_DONE if is_last else STATUS_IN_PROGRESS,
+                        last_start_position=next_start_position, rows=len(batch)
+                    )]
+                }
+
+            if not chunk_complete:
+                # chunk vacío o última página llena: batch vacío que solo cierra el chunk
+                yield {
+                    "QueryResponse": {entity: []},
+                    "_checkpoints": [chunk_checkpoint(
+                        entity, chunk, STATUS_DONE, last_start_position=next_start_position
+                    )]
+                }
+
+        except Exception as e:
+            # igual que en modo batch: se loguea y se sigue con el siguiente chunk
+            print(f"Error en chunk {chunk_number}: {str(e)}")
+            if pipeline_uuid:
+                save_checkpoints(get_engine(), pipeline_uuid, [chunk_checkpoint(
+                    entity, chunk, STATUS_ERROR,
+                    last_start_position=next_start_position, error_message=str(e)
+                )])
+
+
+def _stream_entities(entities, **stream_kwargs):
+    for entity in entities:
+        yield from stream_backfill_batches(entity=entity, **stream_kwargs)
+
+
+def _merge_outputs(outputs):
+    # una salida por entidad -> una sola con QueryResponse y logs de todas
+    merged = {"QueryResponse": {}, "_processing_log": [], "_checkpoints": [], "_chunks": [], "_backfill_summary": {}}
+    for entity, data in outputs.items():
+        merged["QueryResponse"].update(data["QueryResponse"])
+        merged["_processing_log"].extend({**log, "entity": entity} for log in data["_processing_log"])
+        merged["_checkpoints"].extend(data["_checkpoints"])
+        merged["_chunks"].extend(data["_chunks"])
+        merged["_backfill_summary"][entity] = data["_backfill_summary"]
+    return merged
+
+
+def extract_entities(entities, realm_id, base_url=DEFAULT_BASE_URL, minor_version=DEFAULT_MINOR_VERSION,
+                     **kwargs):
+    """
+    Punto de entrada de los loaders: extrae una o varias entidades con las
+    variables del trigger (kwargs). Con una sola entidad la salida tiene la
+    misma forma que tenían los loaders por entidad.
+    """
+    entities = resolve_entities(entities)
+    # access token cacheado (utils/qb_auth): se refresca solo cerca de expirar o ante un 401
+    access_token = get_access_token()
+
+    # chunks en paralelo (1 = secuencial), acotado al límite por realm de QBO
+    max_parallel_chunks = resolve_max_parallel_chunks(kwargs.get('max_parallel_chunks', 1))
+
+    # pool de conexiones keep-alive compartido por todas las entidades, chunks y páginas
+    pool_size = int(kwargs.get('http_pool_size', DEFAULT_POOL_SIZE))
+    get_session(max(pool_size, max_parallel_chunks))
+
+    # presupuesto de requests por minuto del realm, compartido entre pipelines
+    # (0 lo desactiva, para correr contra el stub local)
+    requests_per_minute = kwargs.get('qb_requests_per_minute')
+    if requests_per_minute is not None and int(requests_per_minute) == 0:
+        disable_rate_limiter(realm_id)
+    else:
+        get_rate_limiter(realm_id, int(requests_per_minute) if requests_per_minute else None)
+
+    global_vars = kwargs.get('global_vars') or {}
+    fecha_inicio = kwargs.get('fecha_inicio') or global_vars.get('fecha_inicio')
+    fecha_fin = kwargs.get('fecha_fin') or global_vars.get('fecha_fin')
+    chunk_days = kwargs.get('chunk_days') or global_vars.get('chunk_days', 7)
+
+    if kwargs.get('mode') == 'cdc':
+        # MODO INCREMENTAL: un solo request /cdc para todas las entidades
+        print(f"Modo: INCREMENTAL CDC de {', '.join(entities)}")
+        return extract_cdc(
+            realm_id, access_token, base_url, minor_version,
+            entities, get_engine(), kwargs.get('cdc_since')
+        )
+
+    if fecha_inicio and fecha_fin:
+        print(f"Modo: BACKFILL con parámetros de fecha para {', '.join(entities)}")
+
+        # checkpoints en qb_backfill_state: se omiten chunks ya cargados y se
+        # retoma desde la última página (resume_backfill=false lo desactiva)
+        pipeline_uuid = kwargs.get('pipeline_uuid') if flag(kwargs, 'resume_backfill', True) else None
+        retry_failed_only = flag(kwargs, 'retry_failed_only')
+
+        # adaptive_chunks: la ventana crece o se parte según filas y latencia observadas
+        adaptive_options = adaptive_chunk_options(kwargs) if flag(kwargs, 'adaptive_chunks') else None
+
+        # engine: async -> asyncio/httpx con max_in_flight requests en vuelo entre chunks
+        engine = resolve_engine(kwargs.get('engine'))
+        max_in_flight = resolve_max_in_flight(kwargs.get('max_in_flight'))
+        # page_fanout: COUNT(*) por chunk y todas sus páginas en paralelo
+        page_fanout = flag(kwargs, 'page_fanout')
+
+        if flag(kwargs, 'streaming'):
+            # un batch por página hacia transform/export (Mage ejecuta los
+            # bloques siguientes por cada batch que produce el generador)
+            return _stream_entities(
+                entities,
+                realm_id=realm_id, access_token=access_token, base_url=base_url,
+                minor_version=minor_version, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                chunk_days=chunk_days, pipeline_uuid=pipeline_uuid, retry_failed_only=retry_failed_only
+            )
+
+        outputs = {
+            entity: process_backfill_chunks(
+                realm_id, access_token, base_url, minor_version, entity,
+                fecha_inicio, fecha_fin, chunk_days, max_parallel_chunks,
+                pipeline_uuid, retry_failed_only, adaptive_options,
+                engine, max_in_flight, page_fanout
+            )
+            for entity in entities
+        }
+        data = outputs[entities[0]] if len(entities) == 1 else _merge_outputs(outputs)
+        data['_extraction_metadata'] = {
+            'extraction_type': 'backfill',
+            'entity': entities[0] if len(entities) == 1 else None,
+            'entities': entities,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'chunk_days': chunk_days,
+            'max_parallel_chunks': max_parallel_chunks,
+            'adaptive_chunks': adaptive_options is not None,
+            'engine': engine,
+            'page_fanout': page_fanout,
+            'extracted_at': datetime.utcnow().isoformat()
+        }
+    else:
+        print(f"Modo: EXTRACCIÓN COMPLETA de {', '.join(entities)} (sin filtros de fecha)")
+        data = {"QueryResponse": {}}
+        for entity in entities:
+            response = fetch_qb_data(realm_id, access_token, f'SELECT * FROM {entity}', base_url, minor_version)
+            data["QueryResponse"][entity] = response.get("QueryResponse", {}).get(entity, [])
+
+        # Agregar metadata para mantener consistencia
+        data['_extraction_metadata'] = {
+            'extraction_type': 'full',
+            'entity': entities[0] if len(entities) == 1 else None,
+            'entities': entities,
+            'extracted_at': datetime.utcnow().isoformat()
+        }
+
+    return data
@@ -0,0 +1,245 @@
+# Aplanado de los payload de raw_qb_invoice en dos tablas tipadas:
+# invoices (una fila por invoice) e invoice_lines (una fila por elemento de
+# Line, con el Id/DocNumber de su invoice). Lee la tabla raw en batches con
+# un cursor del lado del servidor y escribe cada batch en su propia
+# transacción, así la memoria queda acotada a un batch sin importar el
+# tamaño de la tabla. Por defecto solo procesa las filas raw que todavía no
+# están aplanadas: anti-join por (id, ingested_at_utc) contra invoices, que no
+# depende del orden en que se commitean los exports (un export lento o dos
+# corridas que se pisan no dejan filas atrás, como pasaría con un watermark).
+import time
+
+import pandas as pd
+
+from scheduler.utils.pg_bulk import copy_to_staging
+
+RAW_INVOICE_TABLE = 'raw_qb_invoice'
+INVOICES_TABLE = 'invoices'
+INVOICE_LINES_TABLE = 'invoice_lines'
+DEFAULT_FLATTEN_BATCH_SIZE = 5000
+
+# columna -> (columna de json_normalize con sep="_", tipo en Postgres)
+INVOICE_FIELDS = {
+    'id': ('Id', 'text'),
+    'doc_number': ('DocNumber', 'text'),
+    'sync_token': ('SyncToken', 'text'),
+    'txn_date': ('TxnDate', 'date'),
+    'due_date': ('DueDate', 'date'),
+    'customer_id': ('CustomerRef_value', 'text'),
+    'customer_name': ('CustomerRef_name', 'text'),
+    'currency': ('CurrencyRef_value', 'text'),
+    'total_amt': ('TotalAmt', 'numeric'),
+    'balance': ('Balance', 'numeric'),
+    'create_time': ('MetaData_CreateTime', 'timestamptz'),
+    'last_updated_time': ('MetaData_LastUpdatedTime', 'timestamptz'),
+    'raw_ingested_at': ('_raw_ingested_at', 'timestamptz'),
+}
+
+LINE_FIELDS = {
+    'invoice_id': ('invoice_Id', 'text'),
+    'doc_number': ('invoice_DocNumber', 'text'),
+    'line_index': ('_line_index', 'integer'),
+    'line_id': ('Id', 'text'),
+    'line_num': ('LineNum', 'integer'),
+    'detail_type': ('DetailType', 'text'),
+    'description': ('Description', 'text'),
+    'amount': ('Amount', 'numeric'),
+    'item_id': ('SalesItemLineDetail_ItemRef_value', 'text'),
+    'item_name': ('SalesItemLineDetail_ItemRef_name', 'text'),
+    'qty': ('SalesItemLineDetail_Qty', 'numeric'),
+    'unit_price': ('SalesItemLineDetail_UnitPrice', 'numeric'),
+}
+
+
+def _table_ddl(table_name, fields, primary_key):
+    columns = ',\n    '.join(f"{column} {pg_type}" for column, (_, pg_type) in fields.items())
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table_name} (\n    {columns},\n"
+        f"    PRIMARY KEY ({', '.join(primary_key)})\n)"
+    )
+
+
+def ensure_flat_tables(cursor):
+    cursor.execute(_table_ddl(INVOICES_TABLE, INVOICE_FIELDS, ['id']))
+    # line_index: posición en Line (las líneas de subtotal no traen Id)
+    cursor.execute(_table_ddl(INVOICE_LINES_TABLE, LINE_FIELDS, ['invoice_id', 'line_index']))
+
+
+def _select_fields(df, fields):
+    # columnas en el orden de la tabla; las que no vinieron en el batch quedan nulas
+    df = df.reindex(columns=[source for source, _ in fields.values()])
+    df.columns = list(fields)
+    for column, (_, pg_type) in fields.items():
+        if pg_type == 'numeric':
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        elif pg_type == 'integer':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+    return df
+
+
+def flatten_invoices(payloads, ingested_at=None):
+    """
+    Payloads de invoices (e ingested_at_utc de cada uno, en paralelo) ->
+    (df_invoices, df_lines, ids borrados). Los borrados (CDC, status Deleted)
+    no generan filas: se eliminan de ambas tablas.
+    """
+    ingested_at = ingested_at if ingested_at is not None else [None] * len(payloads)
+    invoices = []
+    invoices_ingested_at = []
+    deleted_ids = []
+    for payload, ingested_at_utc in zip(payloads, ingested_at):
+        if payload.get('status') == 'Deleted':
+            deleted_ids.append(payload.get('Id'))
+        else:
+            invoices.append(payload)
+            invoices_ingested_at.append(ingested_at_utc)
+
+    df_invoices = pd.json_normalize(invoices, sep='_')
+    if len(df_invoices):
+        df_invoices['_raw_ingested_at'] = invoices_ingested_at
+
+    with_lines = [invoice for invoice in invoices if invoice.get('Line')]
+    df_lines = pd.json_normalize(
+        with_lines,
+        record_path=['Line'],
+        meta=['Id', 'DocNumber'],  # claves de la factura padre
+        meta_prefix='invoice_',
+        errors='ignore',
+        sep='_'
+    )
+    if len(df_lines):
+        df_lines['_line_index'] = df_lines.groupby('invoice_Id', sort=False).cumcount() + 1
+
+    return _select_fields(df_invoices, INVOICE_FIELDS), _select_fields(df_lines, LINE_FIELDS), deleted_ids
+
+
+def write_flat_batch(engine, df_invoices, df_lines, deleted_ids=()):
+    """
+    Upsert de las invoices del batch y reemplazo de sus líneas (una invoice
+    editada puede tener menos líneas que antes), en una sola transacción.
+    """
+    invoice_columns = ', '.join(INVOICE_FIELDS)
+    update_list = ', '.join(f"{column} = EXCLUDED.{column}" for column in INVOICE_FIELDS if column != 'id')
+    line_columns = ', '.join(LINE_FIELDS)
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            ensure_flat_tables(cursor)
+            staging_invoices = copy_to_staging(cursor, df_invoices, INVOICES_TABLE)
+            cursor.execute(f"""
+                INSERT INTO {INVOICES_TABLE} ({invoice_columns})
+                SELECT {invoice_columns} FROM {staging_invoices}
+                ON CONFLICT (id) DO UPDATE SET {update_list}
+            """)
+            cursor.execute(f"""
+                DELETE FROM {INVOICE_LINES_TABLE}
+                WHERE invoice_id IN (SELECT id FROM {staging_invoices})
+                   OR invoice_id = ANY(%s)
+            """, (list(deleted_ids),))
+            cursor.execute(
+                f"DELETE FROM {INVOICES_TABLE} WHERE id = ANY(%s)", (list(deleted_ids),)
+            )
+            staging_lines = copy_to_staging(cursor, df_lines, INVOICE_LINES_TABLE)
+            cursor.execute(f"""
+                INSERT INTO {INVOICE_LINES_TABLE} ({line_columns})
+                SELECT {line_columns} FROM {staging_lines}
+            """)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+# filas raw pendientes: la versión no está en invoices (mismo id e
+# ingested_at_utc) o, si es un borrado, la invoice sigue ahí
+PENDING_RAW_FILTER = f"""
+    WHERE CASE WHEN r.payload->>'status' = 'Deleted'
+        THEN EXISTS (SELECT 1 FROM {INVOICES_TABLE} i WHERE i.id = r.id)
+        ELSE NOT EXISTS (
+            SELECT 1 FROM {INVOICES_TABLE} i
+            WHERE i.id = r.id AND i.raw_ingested_at = r.ingested_at_utc
+        )
+    END
+"""
+
+
+def iter_raw_invoices(engine, full_refresh=False, batch_size=DEFAULT_FLATTEN_BATCH_SIZE):
+    """
+    Genera batches [(payload, ingested_at_utc)] de raw_qb_invoice con un
+    cursor del lado del servidor (itersize = batch_size), en orden de
+    (ingested_at_utc, id): solo las pendientes, o todas con full_refresh.
+    """
+    pending_filter = '' if full_refresh else PENDING_RAW_FILTER
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor(name='flatten_qb_invoices') as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(
+                f"SELECT r.payload, r.ingested_at_utc FROM {RAW_INVOICE_TABLE} r "
+                f"{pending_filter} ORDER BY r.ingested_at_utc, r.id"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+    finally:
+        connection.close()
+
+
+def prepare_flatten(engine):
+    """
+    Crea invoices/invoice_lines y el índice (ingested_at_utc, id) de la
+    tabla raw. Devuelve False si la tabla raw todavía no existe.
+    """
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", (RAW_INVOICE_TABLE,))
+            if cursor.fetchone()[0] is None:
+                return False
+            ensure_flat_tables(cursor)
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {RAW_INVOICE_TABLE}_ingested_at_idx "
+                f"ON {RAW_INVOICE_TABLE} (ingested_at_utc, id)"
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    return True
+
+
+def flatten_raw_invoices(engine, batch_size=DEFAULT_FLATTEN_BATCH_SIZE, full_refresh=False):
+    """
+    Recorre raw_qb_invoice en batches y escribe invoices/invoice_lines de
+    forma incremental. Devuelve un resumen con filas y batches procesados.
+    """
+    summary = {'batches': 0, 'invoices': 0, 'invoice_lines': 0, 'deleted': 0}
+    if not prepare_flatten(engine):
+        print(f"La tabla {RAW_INVOICE_TABLE} no existe todavía, no hay nada que aplanar")
+        return summary
+    scope = 'completa' if full_refresh else 'filas pendientes'
+    print(f"Aplanando {RAW_INVOICE_TABLE} ({scope}) en batches de {batch_size}")
+
+    start_time = time.time()
+    for rows in iter_raw_invoices(engine, full_refresh, batch_size):
+        payloads = [payload for payload, _ in rows]
+        ingested_at = [ingested_at_utc for _, ingested_at_utc in rows]
+        df_invoices, df_lines, deleted_ids = flatten_invoices(payloads, ingested_at)
+        write_flat_batch(engine, df_invoices, df_lines, deleted_ids)
+
+        summary['batches'] += 1
+        summary['invoices'] += len(df_invoices)
+        summary['invoice_lines'] += len(df_lines)
+        summary['deleted'] += len(deleted_ids)
+        print(f"Batch {summary['batches']}: {len(df_invoices)} invoices, {len(df_lines)} líneas")
+
+    summary['duration_seconds'] = round(time.time() - start_time, 2)
+    print(
+        f"Aplanado completo: {summary['invoices']} invoices, {summary['invoice_lines']} líneas, "
+        f"{summary['deleted']} borradas en {summary['duration_seconds']:.2f}s"
+    )
+    return summary
@@ -0,0 +1,29 @@
+# Serialización JSON de los payload de QBO para las tablas raw. Usa orjson
+# si está instalado (varias veces más rápido que json) y si no el módulo
+# json con separadores compactos; en jsonb ambos quedan iguales. La salida
+# nunca trae caracteres de control sin escapar, así pg_bulk la copia a
+# Postgres tal cual, sin volver a escaparla como CSV.
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_ENGINE = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(obj):
+    """obj -> texto JSON compacto (valores no serializables con str)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str, separators=(',', ':'), ensure_ascii=False)
+
+
+def dumps_many(records):
+    """Lista de entidades -> lista de textos JSON, en el mismo orden."""
+    if orjson is not None:
+        encode = orjson.dumps
+        option = orjson.OPT_NON_STR_KEYS
+        return [encode(record, default=str, option=option).decode() for record in records]
+    return [dumps(record) for record in records]
@@ -0,0 +1,79 @@
+# Paginación de una ventana de fechas con fan-out: primero un
+# SELECT COUNT(*) de la ventana, luego todos los STARTPOSITION a la vez y
+# merge en orden. Un chunk de 10 páginas pasa de 10 round-trips
+# secuenciales a ~2 (COUNT + una tanda de páginas en paralelo).
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler.utils.qb_client import QBO_MAX_CONCURRENT_REQUESTS, fetch_qb_data
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def window_filter(chunk_start, chunk_end):
+    return (
+        f"WHERE Metadata.LastUpdatedTime >= '{chunk_start}' "
+        f"AND Metadata.LastUpdatedTime < '{chunk_end}'"
+    )
+
+
+def window_query(entity, chunk_start, chunk_end, start_position, page_size=DEFAULT_PAGE_SIZE):
+    return (
+        f"SELECT * FROM {entity} {window_filter(chunk_start, chunk_end)} "
+        f"STARTPOSITION {start_position} MAXRESULTS {page_size}"
+    )
+
+
+def count_query(entity, chunk_start, chunk_end):
+    return f"SELECT COUNT(*) FROM {entity} {window_filter(chunk_start, chunk_end)}"
+
+
+def page_offsets(total_count, page_size=DEFAULT_PAGE_SIZE, start_position=1):
+    """STARTPOSITION de cada página desde start_position hasta cubrir total_count filas."""
+    return list(range(start_position, total_count + 1, page_size))
+
+
+def merge_pages(offsets, batches, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Arma [(page_number, start_position, batch, is_last)] en orden, igual
+    que iter_<entidad>_pages; descarta páginas vacías.
+    """
+    pages = [
+        ((offset - 1) // page_size + 1, offset, batch)
+        for offset, batch in zip(offsets, batches) if batch
+    ]
+    return [
+        (page_number, offset, batch, index == len(pages) - 1)
+        for index, (page_number, offset, batch) in enumerate(pages)
+    ]
+
+
+def fetch_pages_fanout(realm_id, access_token, base_url, minor_version, entity,
+                       chunk_start, chunk_end, page_size=DEFAULT_PAGE_SIZE, start_position=1,
+                       max_workers=QBO_MAX_CONCURRENT_REQUESTS):
+    """
+    Lee todas las páginas de la ventana en paralelo a partir del COUNT(*).
+    Devuelve [(page_number, start_position, batch, is_last)].
+    """
+    data = fetch_qb_data(
+        realm_id, access_token, count_query(entity, chunk_start, chunk_end), base_url, minor_version
+    )
+    total_count = data.get("QueryResponse", {}).get("totalCount", 0)
+    offsets = page_offsets(total_count, page_size, start_position)
+
+    def fetch_page(offset):
+        query = window_query(entity, chunk_start, chunk_end, offset, page_size)
+        page = fetch_qb_data(realm_id, access_token, query, base_url, minor_version)
+        return page.get("QueryResponse", {}).get(entity, [])
+
+    batches = []
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(len(offsets), max_workers)) as executor:
+            batches = list(executor.map(fetch_page, offsets))
+
+    # el COUNT es una foto: si después entraron filas a la ventana la última
+    # página viene llena y se sigue paginando en serie hasta una incompleta
+    while batches and len(batches[-1]) == page_size:
+        offsets.append(offsets[-1] + page_size)
+        batches.append(fetch_page(offsets[-1]))
+
+    return merge_pages(offsets, batches, page_size)
@@ -0,0 +1,173 @@
+# Token bucket por realm compartido entre procesos.
+# El estado (tokens disponibles y bloqueo por Retry-After) vive en un archivo
+# JSON protegido con flock, así los tres pipelines qb_*_backfill que corren a
+# la vez en el contenedor de Mage consumen del mismo presupuesto de requests.
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+# límite documentado por QBO: 500 requests por minuto por realm
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_BURST = 10
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), 'qb_rate_limit')
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Reparte requests_per_minute entre todos los procesos que usen la misma
+    key. Se reserva burst del presupuesto para ráfagas, de modo que en
+    cualquier ventana de 60s nunca se superan requests_per_minute.
+    """
+
+    def __init__(self, key, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 burst=DEFAULT_BURST, state_dir=DEFAULT_STATE_DIR):
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', str(key))
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f'{safe_key}.json')
+        self.configure(requests_per_minute, burst)
+
+    def configure(self, requests_per_minute, burst=DEFAULT_BURST):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute debe ser mayor a 0")
+        self.requests_per_minute = requests_per_minute
+        self.capacity = max(1, min(burst, requests_per_minute // 2))
+        self.rate = (requests_per_minute - self.capacity) / 60.0
+
+    @contextmanager
+    def _locked_state(self):
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        tokens = state.get('tokens', self.capacity)
+        updated_at = state.get('updated_at', now)
+        state['tokens'] = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+        state['updated_at'] = now
+
+    def try_acquire(self):
+        """
+        Toma un token si hay uno disponible y devuelve 0; si no, devuelve los
+        segundos a esperar antes de volver a intentar (sin bloquear).
+        """
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            blocked_until = state.get('blocked_until', 0)
+            if now < blocked_until:
+                return blocked_until - now
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                return 0
+            return (1 - state['tokens']) / self.rate
+
+    def acquire(self):
+        """Bloquea hasta obtener un token y devuelve los segundos esperados."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def block_for(self, seconds):
+        """Pausa a todos los procesos (p. ej. tras un 429 con Retry-After)."""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            state['tokens'] = 0
+            state['blocked_until'] = max(state.get('blocked_until', 0), now + seconds)
+
+
+class NoRateLimit:
+    """
+    Limiter sin presupuesto para benchmarks y el stub local: no espera
+    entre requests, pero sí respeta los bloqueos por Retry-After (solo en
+    este proceso).
+    """
+
+    requests_per_minute = None
+
+    def __init__(self):
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            return max(0.0, self.blocked_until - time.time())
+
+    def acquire(self):
+        wait = self.try_acquire()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def block_for(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+
+def set_rate_limiter(realm_id, limiter):
+    """
+    Reemplaza el limiter del realm en este proceso (p. ej. NoRateLimit() o un
+    TokenBucket con otro state_dir); lo usan los siguientes requests.
+    """
+    with _limiters_lock:
+        _limiters[realm_id] = limiter
+    return limiter
+
+
+def disable_rate_limiter(realm_id):
+    return set_rate_limiter(realm_id, NoRateLimit())
+
+
+def get_rate_limiter(realm_id, requests_per_minute=None):
+    """
+    Limiter del realm en este proceso. Con requests_per_minute se
+    reconfigura (un limiter desactivado vuelve a ser un TokenBucket).
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(realm_id)
+        if limiter is None or (requests_per_minute and not isinstance(limiter, TokenBucket)):
+            limiter = TokenBucket(
+                f'realm_{realm_id}',
+                requests_per_minute or DEFAULT_REQUESTS_PER_MINUTE
+            )
+            _limiters[realm_id] = limiter
+        elif requests_per_minute and requests_per_minute != limiter.requests_per_minute:
+            limiter.configure(requests_per_minute)
+        return limiter
+
+
+def parse_retry_after(value):
+    # Retry-After puede venir en segundos o como fecha HTTP
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
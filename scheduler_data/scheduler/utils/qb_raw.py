@@ -0,0 +1,121 @@
+# Formato raw staging común a todas las entidades de QBO: una fila por
+# entidad con el JSON completo en payload y la ventana/página de extracción.
+# Lo usan los transformers transform_qb_* para armar el frame que va al exporter.
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from scheduler.utils.qb_json import dumps, dumps_many
+
+DTYPE_BACKENDS = ('numpy', 'pyarrow')
+
+
+def raw_table_name(entity):
+    """Invoice -> qb_invoice (el exporter escribe en raw_qb_invoice)."""
+    return f"qb_{entity.lower()}"
+
+
+def resolve_dtype_backend(value):
+    """numpy (default) o pyarrow; sin pyarrow instalado se sigue con numpy."""
+    dtype_backend = (value or 'numpy').lower()
+    if dtype_backend not in DTYPE_BACKENDS:
+        raise ValueError(f"raw_dtype_backend debe ser uno de {DTYPE_BACKENDS}, no {value!r}")
+    if dtype_backend == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow no está instalado, el frame raw se arma con dtypes numpy")
+            return 'numpy'
+    return dtype_backend
+
+
+def _constant_column(value, n_rows):
+    # el mismo valor en todas las filas: categórica de una categoría (1 byte por fila)
+    if value is None:
+        return np.full(n_rows, None, dtype=object)
+    return pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), categories=[value])
+
+
+def _repeated_column(values, counts):
+    # values[i] repetido counts[i] veces, como categórica (un código por fila)
+    categories = list(dict.fromkeys(values))
+    index = {value: code for code, value in enumerate(categories)}
+    codes = np.repeat(np.array([index[value] for value in values], dtype=np.int32), counts)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def _text_column(values, dtype_backend):
+    # con pyarrow los strings quedan contiguos en un buffer Arrow, no un objeto por fila
+    if dtype_backend == 'pyarrow':
+        return pd.array(values, dtype='string[pyarrow]')
+    return values
+
+
+def join_chunk_windows(df, chunks, entity):
+    """
+    Join de la tabla de chunks (_chunks del loader) con las filas de entity:
+    la ventana de cada fila sale del chunk cuyo rango de filas la contiene.
+    Sin tabla de chunks (streaming, CDC, extracción completa) df queda igual.
+    """
+    entries = sorted(
+        (chunk for chunk in chunks or [] if chunk['entity'] == entity and chunk['row_count']),
+        key=lambda chunk: chunk['row_start']
+    )
+    if df.empty or not entries:
+        return df
+
+    counts = [chunk['row_count'] for chunk in entries]
+    if sum(counts) != len(df):
+        raise ValueError(f"La tabla de chunks de {entity} cubre {sum(counts)} filas, no {len(df)}")
+    df["extract_window_start_utc"] = _repeated_column([chunk['chunk_start'] for chunk in entries], counts)
+    df["extract_window_end_utc"] = _repeated_column([chunk['chunk_end'] for chunk in entries], counts)
+    return df
+
+
+def build_raw_frame(records, batch_metadata=None, kwargs=None):
+    """
+    Frame raw armado por columnas: id y payload por entidad, el resto son
+    valores del batch que se difunden (un timestamp por batch, categóricas
+    de una categoría). raw_dtype_backend=pyarrow guarda id/payload en Arrow.
+    """
+    batch_metadata = batch_metadata or {}
+    kwargs = kwargs or {}
+    n_rows = len(records)
+    dtype_backend = resolve_dtype_backend(kwargs.get("raw_dtype_backend"))
+
+    ingested_at_utc = datetime.now(timezone.utc).isoformat()
+    extract_window_start_utc = batch_metadata.get("chunk_start") or kwargs.get("extract_window_start_utc", ingested_at_utc)
+    extract_window_end_utc = batch_metadata.get("chunk_end") or kwargs.get("extract_window_end_utc", ingested_at_utc)
+    page_number = batch_metadata.get("page_number") or kwargs.get("page_number", 1)
+    page_size = batch_metadata.get("page_size") or kwargs.get("page_size", n_rows)
+    request_payload = dumps(kwargs.get("request_payload", {}))  # constante: una sola vez
+
+    return pd.DataFrame({
+        "id": _text_column([record.get("Id") for record in records], dtype_backend),
+        "payload": _text_column(dumps_many(records), dtype_backend),  # JSON completo de la entidad
+        "ingested_at_utc": _constant_column(ingested_at_utc, n_rows),
+        "extract_window_start_utc": _constant_column(extract_window_start_utc, n_rows),
+        "extract_window_end_utc": _constant_column(extract_window_end_utc, n_rows),
+        "page_number": np.full(n_rows, page_number, dtype=np.int64),
+        "page_size": np.full(n_rows, page_size, dtype=np.int64),
+        "request_payload": _constant_column(request_payload, n_rows),
+    })
+
+
+def transform_entities(data, kwargs=None):
+    """
+    QueryResponse con una o varias entidades -> {qb_<entidad>: DataFrame},
+    más los checkpoints / high-water marks que el exporter guarda tras el merge.
+    """
+    output = {}
+    batch_metadata = data.get("_batch_metadata", {})
+    for entity, records in data.get("QueryResponse", {}).items():
+        if not isinstance(records, list):  # startPosition, maxResults, totalCount...
+            continue
+        df = build_raw_frame(records, batch_metadata, kwargs)
+        output[raw_table_name(entity)] = join_chunk_windows(df, data.get("_chunks"), entity)
+
+    output["_checkpoints"] = data.get("_checkpoints", [])
+    output["_cdc_state"] = data.get("_cdc_state")
+    return output
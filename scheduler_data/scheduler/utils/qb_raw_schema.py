@@ -0,0 +1,101 @@
+# Migración idempotente de las tablas raw_qb_* (payload ya es jsonb desde
+# pg_bulk.RAW_TABLE_DDL): columnas generadas con las llaves más consultadas
+# del payload y sus índices. Los exporters la aplican antes del primer merge
+# de cada tabla en el proceso; correrla de nuevo no cambia nada. Las tablas
+# qb_* anteriores (to_sql con payload json) no se tocan.
+#
+# Las columnas generadas tienen que ser IMMUTABLE: el cast de texto a
+# numeric lo es, pero a date/timestamptz no (depende de DateStyle/TimeZone),
+# así que TxnDate y LastUpdatedTime quedan como text (TxnDate en ISO ordena
+# igual que la fecha).
+import threading
+
+from scheduler.utils.pg_bulk import ensure_raw_table
+
+# columna generada -> (expresión sobre payload, tipo)
+RAW_PROJECTIONS = {
+    'txn_date': ("payload->>'TxnDate'", 'text'),
+    'customer_ref': ("payload->'CustomerRef'->>'value'", 'text'),
+    'total_amt': ("(payload->>'TotalAmt')::numeric", 'numeric'),
+    'last_updated_time': ("payload->'MetaData'->>'LastUpdatedTime'", 'text'),
+}
+
+# qué columnas generadas lleva cada tabla (customers/items no tienen TxnDate ni CustomerRef)
+TRANSACTION_PROJECTIONS = ['txn_date', 'customer_ref', 'total_amt', 'last_updated_time']
+RAW_TABLE_PROJECTIONS = {
+    'raw_qb_invoice': TRANSACTION_PROJECTIONS,
+    'raw_qb_payment': TRANSACTION_PROJECTIONS,
+    'raw_qb_bill': ['txn_date', 'total_amt', 'last_updated_time'],
+}
+DEFAULT_PROJECTIONS = ['last_updated_time']
+
+# B-tree por columna generada + GIN jsonb_path_ops para búsquedas payload @> '{...}'
+BTREE_COLUMNS = ['txn_date', 'customer_ref', 'last_updated_time']
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def _column_type(cursor, table_name, column):
+    cursor.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+        (table_name, column)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def migrate_raw_table(cursor, table_name, projections=None):
+    """
+    Lleva table_name al esquema raw actual (projections: columnas generadas,
+    por defecto las de RAW_TABLE_PROJECTIONS). Devuelve la lista de cambios
+    aplicados (vacía si ya estaba al día).
+    """
+    applied = []
+    if projections is None:
+        projections = RAW_TABLE_PROJECTIONS.get(table_name, DEFAULT_PROJECTIONS)
+    for column in projections:
+        if _column_type(cursor, table_name, column) is not None:
+            continue
+        expression, pg_type = RAW_PROJECTIONS[column]
+        cursor.execute(
+            f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS {column} {pg_type} '
+            f'GENERATED ALWAYS AS ({expression}) STORED'
+        )
+        applied.append(column)
+
+    for column in projections:
+        if column in BTREE_COLUMNS:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table_name}_{column}_idx" ON "{table_name}" ({column})'
+            )
+    cursor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{table_name}_payload_gin_idx" '
+        f'ON "{table_name}" USING gin (payload jsonb_path_ops)'
+    )
+    return applied
+
+
+def ensure_raw_schema(engine, table_name):
+    """
+    Crea table_name si no existe y le aplica migrate_raw_table, una vez por
+    tabla y proceso (los exporters la llaman antes de cada merge).
+    """
+    with _migrated_lock:
+        if table_name in _migrated:
+            return
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                ensure_raw_table(cursor, table_name)
+                applied = migrate_raw_table(cursor, table_name)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        if applied:
+            print(f"Migración de {table_name}: {', '.join(applied)}")
+        _migrated.add(table_name)
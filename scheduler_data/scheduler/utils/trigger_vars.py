@@ -0,0 +1,22 @@
+# Lectura de variables de trigger/runtime de Mage: llegan como bool desde
+# código, pero desde triggers.yaml o la UI suelen llegar como string
+# ("false", "0"), y bool("false") es True.
+TRUE_VALUES = ('true', '1', 'yes', 'si', 'sí', 'on')
+FALSE_VALUES = ('false', '0', 'no', 'off', '')
+
+
+def flag(kwargs, name, default=False):
+    """kwargs[name] como bool (true/false, 1/0, yes/no, on/off); default si falta o es None."""
+    value = kwargs.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    normalized = str(value).strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ValueError(f"{name} debe ser true/false, no {value!r}")